@@ -0,0 +1,178 @@
+# app/hashing.py
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from . import security
+
+# -------------------------------------------------------
+# ⚙️ Pool de hachage bcrypt (surchargeable via .env)
+# -------------------------------------------------------
+# bcrypt coûte ~100-250 ms de CPU : les calculs partent dans des process
+# dédiés pour ne bloquer ni la boucle ni le threadpool des autres routes.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# Au-delà de HASH_MAX_PENDING calculs en attente ou en cours, la requête
+# est refusée tout de suite (503) plutôt que d'allonger la file.
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", "1"))
+
+# Tâches d'un lot (import) dans le pool en même temps : un worker reste
+# libre pour login / register (1 si un seul worker)
+HASH_BULK_CONCURRENCY = int(os.getenv("HASH_BULK_CONCURRENCY", str(max(1, HASH_WORKERS - 1))))
+
+_pool = None
+_bulk_slots = asyncio.Semaphore(HASH_BULK_CONCURRENCY)   # partagé par tous les imports
+
+
+def _timed(fn, *args):
+    """Exécuté dans le process du pool : (résultat, durée de calcul)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _noop():
+    return None
+
+
+class HashMetrics:
+    def __init__(self):
+        self.pending = 0          # en attente + en cours
+        self.max_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.bulk_waiting = 0     # mots de passe d'un lot pas encore envoyés au pool
+        self.wait_total = 0.0     # temps passé dans la file
+        self.run_total = 0.0      # temps de calcul bcrypt
+
+    def snapshot(self) -> dict:
+        done = self.completed or 1
+        return {
+            "workers": HASH_WORKERS,
+            "max_pending": HASH_MAX_PENDING,
+            "pending": self.pending,
+            "peak_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "bulk_waiting": self.bulk_waiting,
+            "avg_wait_ms": round(self.wait_total / done * 1000, 1),
+            "avg_run_ms": round(self.run_total / done * 1000, 1),
+        }
+
+
+metrics = HashMetrics()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn : les workers ne récupèrent ni l'engine SQLAlchemy ni ses connexions
+        _pool = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def start():
+    """Démarre les workers à l'avance (le premier login ne paie pas le spawn)."""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(HASH_WORKERS)))
+    print(f"🔐 Pool de hachage prêt → {HASH_WORKERS} workers")
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _busy():
+    raise HTTPException(
+        503,
+        "Serveur occupé, réessayez dans un instant",
+        headers={"Retry-After": str(HASH_RETRY_AFTER)},
+    )
+
+
+def _reserve():
+    metrics.pending += 1
+    metrics.max_pending = max(metrics.max_pending, metrics.pending)
+
+
+def _admit():
+    """Réserve une place dans la file ou refuse tout de suite (503)."""
+    if metrics.pending >= HASH_MAX_PENDING:
+        metrics.rejected += 1
+        _busy()
+    _reserve()
+
+
+async def _execute(fn, *args):
+    """Exécute une tâche déjà admise dans le pool (une place de file)."""
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result, run = await loop.run_in_executor(get_pool(), _timed, fn, *args)
+    finally:
+        metrics.pending -= 1
+
+    metrics.completed += 1
+    metrics.run_total += run
+    metrics.wait_total += max(0.0, time.perf_counter() - start - run)
+    return result
+
+
+async def _run(fn, *args):
+    _admit()
+    return await _execute(fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(security.hash_password, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run(security.verify_password, password, hashed)
+
+
+async def hash_many(passwords: list) -> list:
+    """
+    Hachage d'un lot (import) dans l'ordre d'entrée, un mot de passe par
+    tâche. Au plus HASH_BULK_CONCURRENCY tâches de lots sont dans le pool
+    en même temps : un worker reste libre pour login / register, qui
+    n'attendent jamais derrière tout le lot (au pire un hachage avec un
+    seul worker). Refusé d'emblée (503) si la file est déjà pleine.
+    """
+    if not passwords:
+        return []
+    if metrics.pending >= HASH_MAX_PENDING:
+        metrics.rejected += len(passwords)
+        _busy()
+
+    async def one(password: str) -> str:
+        metrics.bulk_waiting += 1
+        try:
+            await _bulk_slots.acquire()
+        finally:
+            metrics.bulk_waiting -= 1
+        try:
+            _reserve()
+            return await _execute(security.hash_password, password)
+        finally:
+            _bulk_slots.release()
+
+    tasks = [asyncio.ensure_future(one(p)) for p in passwords]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # Erreur ou annulation : les mots de passe pas encore hachés sont abandonnés
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,126 @@
+# app/imports.py
+import os
+import csv
+import io
+
+from pydantic import TypeAdapter, EmailStr, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .hashing import hash_many
+
+# Nombre maximal de clients par import
+MAX_IMPORT_CLIENTS = int(os.getenv("MAX_IMPORT_CLIENTS", "2000"))
+
+_email = TypeAdapter(EmailStr)
+
+
+def parse_csv(raw: bytes) -> list:
+    """
+    CSV avec en-tête `email,password` (séparateur , ou ;).
+    Retourne une liste de dicts ; les lignes vides sont ignorées.
+    """
+    text = raw.decode("utf-8-sig")
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    if not reader.fieldnames or not {"email", "password"} <= {f.strip().lower() for f in reader.fieldnames}:
+        raise ValueError("En-tête CSV attendu : email,password")
+
+    rows = []
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        if any(row.values()):
+            rows.append({"email": row.get("email", ""), "password": row.get("password", "")})
+    return rows
+
+
+def validate_rows(db: Session, rows: list) -> tuple:
+    """
+    Retourne (lignes valides, erreurs). Les numéros de ligne commencent à 1
+    (première ligne de données). L'unicicité des emails est vérifiée en une
+    seule requête IN pour tout le fichier.
+    """
+    valid = []
+    errors = []
+    seen = set()
+
+    for number, row in enumerate(rows, start=1):
+        email = str(row.get("email") or "").strip()
+        password = str(row.get("password") or "")
+        try:
+            email = _email.validate_python(email)
+        except ValidationError:
+            errors.append({"row": number, "email": email, "error": "Email invalide"})
+            continue
+        if not password:
+            errors.append({"row": number, "email": email, "error": "Mot de passe manquant"})
+            continue
+        if email in seen:
+            errors.append({"row": number, "email": email, "error": "Email en double dans l'import"})
+            continue
+        seen.add(email)
+        valid.append({"row": number, "email": email, "password": password})
+
+    if valid:
+        taken = set(db.scalars(
+            select(models.User.email).where(models.User.email.in_([r["email"] for r in valid]))
+        ))
+        errors += [
+            {"row": r["row"], "email": r["email"], "error": "Email déjà utilisé"}
+            for r in valid if r["email"] in taken
+        ]
+        valid = [r for r in valid if r["email"] not in taken]
+
+    return valid, errors
+
+
+def insert_clients(db: Session, coach_id: int, valid: list, hashes: list) -> tuple:
+    """Un seul INSERT multi-lignes + commit. Retourne (créés, erreurs de conflit)."""
+    stmt = (
+        insert(models.User)
+        .values([
+            {"email": r["email"], "hashed_password": h, "role": "client", "coach_id": coach_id}
+            for r, h in zip(valid, hashes)
+        ])
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(models.User.id, models.User.email, models.User.role, models.User.coach_id)
+    )
+    created = [dict(r) for r in db.execute(stmt).mappings()]
+    db.commit()
+
+    inserted = {u["email"] for u in created}
+    conflicts = [
+        {"row": r["row"], "email": r["email"], "error": "Email déjà utilisé"}
+        for r in valid if r["email"] not in inserted
+    ]
+    return created, conflicts
+
+
+async def import_clients(db: Session, coach_id: int, rows: list) -> dict:
+    """
+    Import groupé : validation, hachage parallèle (pool bcrypt), puis un
+    seul INSERT multi-lignes dans une transaction. Un email créé entre la
+    vérification et l'insertion est signalé en erreur (ON CONFLICT).
+    Les accès base passent par le threadpool, la boucle n'attend que le hachage.
+    """
+    valid, errors = await run_in_threadpool(validate_rows, db, rows)
+
+    created = []
+    if valid:
+        hashes = await hash_many([r["password"] for r in valid])
+        created, conflicts = await run_in_threadpool(insert_clients, db, coach_id, valid, hashes)
+        errors += conflicts
+
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "received": len(rows),
+        "created": created,
+        "errors": errors,
+    }
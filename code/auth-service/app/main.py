@@ -1,11 +1,17 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+import json
+
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from .db import Base, engine, get_db
-from . import models, schemas
-from .security import hash_password, verify_password, create_access_token
+from . import models, schemas, hashing
+from .security import create_access_token
+from .hashing import hash_password, verify_password
+from .profiles import profile_cache, get_profiles, MAX_BATCH_USERS
+from .imports import parse_csv, import_clients, MAX_IMPORT_CLIENTS
 
 # ==========================================================
 # 🚀 Initialisation de l'application
@@ -27,6 +33,16 @@ app.add_middleware(
 Base.metadata.create_all(bind=engine)
 
 
+@app.on_event("startup")
+async def start_hash_pool():
+    await hashing.start()
+
+
+@app.on_event("shutdown")
+def stop_hash_pool():
+    hashing.shutdown()
+
+
 # ==========================================================
 # 🩺 Health Check
 # ==========================================================
@@ -35,17 +51,33 @@ def health():
     return {"status": "ok", "service": "auth-service"}
 
 
+# ==========================================================
+# 🗄️ Accès base (sync) : appelés via run_in_threadpool par les routes
+# async, seul le hachage bcrypt est attendu sur la boucle
+# ==========================================================
+def find_user_by_email(db: Session, email: str) -> models.User | None:
+    return db.execute(
+        select(models.User).where(models.User.email == email)
+    ).scalar_one_or_none()
+
+
+def save_user(db: Session, user: models.User) -> models.User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    profile_cache.invalidate(user.id)
+    return user
+
+
 # ==========================================================
 # 📝 Inscription Coach (seulement coach)
 # ==========================================================
 @app.post("/auth/register", response_model=schemas.UserOut, status_code=201)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     """
     Inscription réservée aux COACHS.
     """
-    existing = db.execute(
-        select(models.User).where(models.User.email == payload.email)
-    ).scalar_one_or_none()
+    existing = await run_in_threadpool(find_user_by_email, db, payload.email)
 
     if existing:
         raise HTTPException(409, "Email déjà utilisé")
@@ -57,27 +89,20 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
 
     user = models.User(
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await hash_password(payload.password),
         role="coach",
     )
-
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(save_user, db, user)
 
 
 # ==========================================================
 # 🔐 Connexion (coach + client)
 # ==========================================================
 @app.post("/auth/login", response_model=schemas.Token)
-def login(payload: schemas.Login, db: Session = Depends(get_db)):
-    user = (
-        db.execute(select(models.User).where(models.User.email == payload.email))
-        .scalar_one_or_none()
-    )
+async def login(payload: schemas.Login, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user_by_email, db, payload.email)
 
-    if not user or not verify_password(payload.password, user.hashed_password):
+    if not user or not await verify_password(payload.password, user.hashed_password):
         raise HTTPException(401, "Identifiants invalides")
 
     token = create_access_token(sub=str(user.id), role=user.role)
@@ -88,7 +113,7 @@ def login(payload: schemas.Login, db: Session = Depends(get_db)):
 # ➕ Création d’un client par un coach
 # ==========================================================
 @app.post("/auth/clients/{coach_id}/add", response_model=schemas.UserOut)
-def create_client_for_coach(
+async def create_client_for_coach(
     coach_id: int,
     payload: schemas.UserCreate,
     db: Session = Depends(get_db),
@@ -97,24 +122,55 @@ def create_client_for_coach(
     Un coach peut créer un client qui lui est lié.
     """
     # Vérifie si email déjà existant
-    existing = db.query(models.User).filter(
-        models.User.email == payload.email
-    ).first()
+    existing = await run_in_threadpool(find_user_by_email, db, payload.email)
 
     if existing:
         raise HTTPException(400, "Email déjà utilisé")
 
     client = models.User(
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await hash_password(payload.password),
         role="client",
         coach_id=coach_id,
     )
+    return await run_in_threadpool(save_user, db, client)
 
-    db.add(client)
-    db.commit()
-    db.refresh(client)
-    return client
+
+# ==========================================================
+# 📥 Import groupé de clients (CSV / JSON)
+# ==========================================================
+@app.post("/auth/clients/{coach_id}/import", response_model=schemas.ClientImportResult)
+async def import_clients_for_coach(
+    coach_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    Corps `text/csv` (en-tête email,password) ou JSON :
+    `[{"email": ..., "password": ...}]` ou `{"clients": [...]}`.
+    Les lignes invalides ou déjà existantes sont listées dans `errors`,
+    les autres sont créées en une seule transaction.
+    """
+    raw = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            rows = parse_csv(raw)
+        else:
+            data = json.loads(raw or b"null")
+            rows = data.get("clients") if isinstance(data, dict) else data
+            if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                raise ValueError("JSON attendu : liste de {email, password}")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(400, f"Import illisible : {e}")
+
+    if not rows:
+        raise HTTPException(400, "Aucun client à importer")
+    if len(rows) > MAX_IMPORT_CLIENTS:
+        raise HTTPException(413, f"Maximum {MAX_IMPORT_CLIENTS} clients par import")
+
+    result = await import_clients(db, coach_id, rows)
+    print(f"📥 Import coach {coach_id} → {len(result['created'])} créés, {len(result['errors'])} erreurs")
+    return result
 
 
 # ==========================================================
@@ -142,18 +198,49 @@ def list_all_clients(db: Session = Depends(get_db)):
 # ==========================================================
 @app.get("/auth/user/{user_id}")
 def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    user = db.get(models.User, user_id)
+    user = get_profiles(db, [user_id]).get(user_id)
     if not user:
         raise HTTPException(404, "Utilisateur introuvable")
 
+    return user
+
+
+# ==========================================================
+# 🔍 Récupérer plusieurs utilisateurs en un appel
+# ==========================================================
+@app.post("/auth/users/batch", response_model=schemas.UserBatchOut)
+def get_users_batch(payload: schemas.UserBatchRequest, db: Session = Depends(get_db)):
+    """
+    Profils de plusieurs utilisateurs (cache puis une seule requête IN).
+    Les ids inconnus sont renvoyés dans `missing`.
+    """
+    ids = list(dict.fromkeys(payload.ids))
+    if len(ids) > MAX_BATCH_USERS:
+        raise HTTPException(413, f"Maximum {MAX_BATCH_USERS} utilisateurs par appel")
+
+    found = get_profiles(db, ids)
     return {
-        "id": user.id,
-        "email": user.email,
-        "role": user.role,
-        "coach_id": user.coach_id,
+        "users": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
     }
 
 
+# ==========================================================
+# 📊 Statistiques du cache de profils
+# ==========================================================
+@app.get("/auth/cache/stats")
+def cache_stats():
+    return {"profiles": profile_cache.stats()}
+
+
+# ==========================================================
+# 📊 File du pool de hachage (profondeur, refus, latences)
+# ==========================================================
+@app.get("/auth/hashing/stats")
+def hashing_stats():
+    return hashing.metrics.snapshot()
+
+
 # ==========================================================
 # 🗑️ Suppression d’un client
 # ==========================================================
@@ -169,4 +256,5 @@ def delete_client(client_id: int, db: Session = Depends(get_db)):
 
     db.delete(client)
     db.commit()
+    profile_cache.invalidate(client_id)
     return {"message": "Client supprimé avec succès"}
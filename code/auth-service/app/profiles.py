@@ -0,0 +1,102 @@
+# app/profiles.py
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# -------------------------------------------------------
+# ⚙️ Cache des profils (surchargeable via .env)
+# -------------------------------------------------------
+# Propre à chaque process : invalidé par les routes de création /
+# suppression de ce process, le TTL borne la fraîcheur entre workers.
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+# Nombre maximal d'ids par appel à /auth/users/batch
+MAX_BATCH_USERS = int(os.getenv("MAX_BATCH_USERS", "1000"))
+
+
+class ProfileCache:
+    """LRU en mémoire {user_id: profil} avec TTL, sûr entre threads."""
+
+    def __init__(self, maxsize: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # user_id -> (expire_at, profil)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, ids) -> dict:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for user_id in ids:
+                entry = self._entries.get(user_id)
+                if entry is None or entry[0] < now:
+                    self._entries.pop(user_id, None)
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(user_id)
+                found[user_id] = entry[1]
+                self.hits += 1
+        return found
+
+    def set_many(self, profiles: dict):
+        expire_at = time.monotonic() + self.ttl
+        with self._lock:
+            for user_id, profile in profiles.items():
+                self._entries[user_id] = (expire_at, profile)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *ids):
+        with self._lock:
+            for user_id in ids:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+profile_cache = ProfileCache()
+
+
+def profile(user: models.User) -> dict:
+    """Profil public (sans mot de passe) d'un utilisateur."""
+    return {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role,
+        "coach_id": user.coach_id,
+    }
+
+
+def get_profiles(db: Session, ids) -> dict:
+    """
+    {user_id: profil} pour les ids existants : lecture dans le cache,
+    puis une seule requête IN pour les ids manquants.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = profile_cache.get_many(ids)
+
+    missing = [i for i in ids if i not in found]
+    if missing:
+        users = db.scalars(select(models.User).where(models.User.id.in_(missing))).all()
+        loaded = {u.id: profile(u) for u in users}
+        profile_cache.set_many(loaded)
+        found.update(loaded)
+
+    return found
@@ -1,5 +1,5 @@
 # app/schemas.py
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 
 # ----------------------------
@@ -30,6 +30,33 @@ class UserOut(UserBase):
         orm_mode = True
 
 
+# ----------------------------
+# Lecture groupée
+# ----------------------------
+class UserBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1)
+
+
+class UserBatchOut(BaseModel):
+    users: list[UserOut]
+    missing: list[int] = []
+
+
+# ----------------------------
+# Import groupé de clients
+# ----------------------------
+class ClientImportError(BaseModel):
+    row: int
+    email: str
+    error: str
+
+
+class ClientImportResult(BaseModel):
+    received: int
+    created: list[UserOut]
+    errors: list[ClientImportError]
+
+
 # ----------------------------
 # Auth
 # ----------------------------
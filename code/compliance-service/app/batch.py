@@ -0,0 +1,106 @@
+# app/batch.py
+import json
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .db import SessionLocal
+
+FIELDS = ("meal_morning_done", "meal_noon_done", "meal_evening_done", "workout_done")
+
+
+def compute_rates(clients: list) -> tuple:
+    """
+    Taux de toutes les entrées de tous les clients en une opération :
+    matrice (N entrées × 4 cases) → taux par ligne, puis moyenne par
+    client avec np.add.reduceat sur les bornes de chaque client.
+    Retourne (taux par entrée, moyenne par client).
+    """
+    counts = np.array([len(c.entries) for c in clients], dtype=np.int64)
+    flags = np.array(
+        [[getattr(e, f) for f in FIELDS] for c in clients for e in c.entries],
+        dtype=np.float64,
+    ).reshape(-1, len(FIELDS))
+
+    rates = np.round(flags.mean(axis=1) * 100, 2)
+
+    averages = np.zeros(len(clients))
+    filled = counts > 0
+    if filled.any():
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        averages[filled] = np.add.reduceat(rates, starts) / counts[filled]
+
+    return rates, np.round(averages, 2)
+
+
+def summarize(clients: list) -> tuple:
+    """([WeeklySummary], [lignes ComplianceRecord à insérer])"""
+    rates, averages = compute_rates(clients)
+
+    summaries = []
+    rows = []
+    offset = 0
+    for client, avg in zip(clients, averages):
+        client_rates = rates[offset:offset + len(client.entries)].tolist()
+        offset += len(client.entries)
+
+        summaries.append({
+            "client_id": client.client_id,
+            "average_compliance": float(avg),
+            "daily_rates": client_rates,
+        })
+        rows += [
+            {"client_id": client.client_id, "daily_data": entry.dict(), "compliance_rate": rate}
+            for entry, rate in zip(client.entries, client_rates)
+        ]
+
+    return summaries, rows
+
+
+def save_records(db: Session, rows: list) -> int:
+    """Insertion groupée (un seul INSERT multi-lignes), sans commit."""
+    if rows:
+        db.execute(insert(models.ComplianceRecord), rows)
+    return len(rows)
+
+
+def stream_batch(spool, save: bool, chunk_size: int):
+    """
+    Flux NDJSON d'un calcul groupé déjà validé (lignes dans `spool`) :
+    les WeeklySummary de chaque paquet sont envoyés dès qu'ils sont
+    calculés, puis {"saved": n}. Avec `save`, toutes les insertions sont
+    dans une seule transaction, validée à la fin : en cas d'erreur rien
+    n'est enregistré et la dernière ligne est {"error": ..., "saved": 0}.
+    Session propre au flux (elle vit jusqu'à la fin de l'envoi).
+    """
+    db = SessionLocal()
+    saved = 0
+    try:
+        spool.seek(0)
+        chunk = []
+        for line in spool:
+            chunk.append(schemas.ClientEntries.model_validate_json(line))
+            if len(chunk) >= chunk_size:
+                saved += yield from _stream_chunk(db, chunk, save)
+                chunk = []
+        if chunk:
+            saved += yield from _stream_chunk(db, chunk, save)
+
+        if save:
+            db.commit()
+        yield json.dumps({"saved": saved}) + "\n"
+    except Exception as e:
+        db.rollback()
+        print("🔴 ERREUR CALCUL GROUPÉ (NDJSON):", e)
+        yield json.dumps({"error": "Échec de l'enregistrement, aucune donnée sauvegardée", "saved": 0}) + "\n"
+    finally:
+        db.close()
+        spool.close()
+
+
+def _stream_chunk(db: Session, clients: list, save: bool):
+    summaries, rows = summarize(clients)
+    yield "".join(json.dumps(s) + "\n" for s in summaries)
+    return save_records(db, rows) if save else 0
@@ -0,0 +1,105 @@
+# app/history.py
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import select, func, literal_column, table, column, Numeric
+from sqlalchemy.orm import Session
+
+from . import models
+from .db import SessionLocal
+
+BUCKETS = ("day", "week", "month")
+
+# Lignes lues par aller-retour avec un curseur serveur (flux NDJSON)
+STREAM_BATCH = 1000
+
+# Table du auth-service, lue seulement (pas de modèle → pas de create_all)
+users = table("users", column("id"), column("coach_id"))
+
+
+def coach_owns(db: Session, coach_id: int, client_ids) -> bool:
+    """Vrai si tous les clients donnés sont rattachés à ce coach (une requête)."""
+    ids = set(client_ids)
+    if not ids:
+        return True
+    owned = db.scalar(
+        select(func.count()).select_from(users)
+        .where(users.c.id.in_(ids), users.c.coach_id == coach_id)
+    )
+    return owned == len(ids)
+
+
+def history_query(
+    bucket: str,
+    client_id: int | None = None,
+    coach_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    by_client: bool = False,
+):
+    """
+    Série temporelle de conformité agrégée par jour / semaine / mois.
+    - client_id : historique d'un client (index client_id, created_at)
+    - coach_id  : tous les clients du coach (jointure users)
+    - by_client : une série par client au lieu d'une série globale
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket inconnu : {bucket}")
+
+    R = models.ComplianceRecord
+    period = func.date_trunc(literal_column(f"'{bucket}'"), R.created_at).label("period")
+
+    columns = [
+        period,
+        func.count().label("records"),
+        func.round(func.avg(R.compliance_rate).cast(Numeric), 2).label("average_compliance"),
+        func.min(R.compliance_rate).label("min_compliance"),
+        func.max(R.compliance_rate).label("max_compliance"),
+    ]
+    group = [period]
+    if coach_id is not None:
+        columns.insert(1, func.count(func.distinct(R.client_id)).label("clients"))
+    if by_client or client_id is not None:
+        columns.insert(0, R.client_id)
+        group.insert(0, R.client_id)
+
+    stmt = select(*columns)
+
+    if client_id is not None:
+        stmt = stmt.where(R.client_id == client_id)
+    if coach_id is not None:
+        stmt = stmt.join(users, users.c.id == R.client_id).where(users.c.coach_id == coach_id)
+
+    # Filtre sur created_at directement : index (client_id, created_at) / BRIN
+    if date_from:
+        stmt = stmt.where(R.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(R.created_at < date_to + timedelta(days=1))
+
+    return stmt.group_by(*group).order_by(*group)
+
+
+def _row(row) -> dict:
+    data = dict(row._mapping)
+    data["period"] = data["period"].date().isoformat()
+    for key in ("average_compliance", "min_compliance", "max_compliance"):
+        data[key] = float(data[key])
+    return data
+
+
+def fetch_history(db: Session, stmt) -> list:
+    return [_row(r) for r in db.execute(stmt)]
+
+
+def stream_history(stmt):
+    """
+    Lignes NDJSON lues par paquets (curseur côté serveur). Session propre
+    au flux : elle reste ouverte jusqu'à la fin de l'envoi de la réponse.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH))
+        for partition in result.partitions():
+            yield "".join(json.dumps(_row(r)) + "\n" for r in partition)
+    finally:
+        db.close()
@@ -1,10 +1,29 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
+import os
+import tempfile
+from datetime import date
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from .db import Base, engine, get_db
 from . import models, schemas
 from .security import verify_token
+from .batch import summarize, save_records, stream_batch
+from .history import history_query, fetch_history, stream_history, coach_owns
+from .migrations import run_migrations
+
+# Limites des calculs groupés (surchargeables via .env)
+MAX_BATCH_CLIENTS = int(os.getenv("MAX_BATCH_CLIENTS", "5000"))
+NDJSON_CHUNK_CLIENTS = int(os.getenv("NDJSON_CHUNK_CLIENTS", "1000"))
+# Corps NDJSON gardé en mémoire jusqu'à cette taille, sur disque au-delà
+NDJSON_SPOOL_BYTES = int(os.getenv("NDJSON_SPOOL_BYTES", str(8 * 1024 * 1024)))
+# Taille maximale d'une ligne (un client) et du corps entier → 413 au-delà
+NDJSON_MAX_LINE_BYTES = int(os.getenv("NDJSON_MAX_LINE_BYTES", str(256 * 1024)))
+NDJSON_MAX_BODY_BYTES = int(os.getenv("NDJSON_MAX_BODY_BYTES", str(256 * 1024 * 1024)))
 
 app = FastAPI(title="FitnessBro Compliance Service - Conformité Repas & Entraînement")
 
@@ -20,6 +39,7 @@ app.add_middleware(
 )
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 # -------------------------------------------------------
 # 🔵 ROUTE : Test de santé
@@ -69,7 +89,7 @@ def calculate_compliance(
 # -------------------------------------------------------
 @app.post("/compliance/weekly", response_model=schemas.WeeklySummary)
 def calculate_weekly_average(
-    payload: dict,
+    payload: schemas.WeeklyRequest,
     user=Depends(verify_token),
 ):
     """
@@ -77,27 +97,202 @@ def calculate_weekly_average(
     - taux quotidien
     - moyenne hebdomadaire
     """
-    entries = payload.get("entries", [])
-    client_id = payload.get("client_id", user["user_id"])
+    if not payload.entries:
+        raise HTTPException(status_code=400, detail="Aucune donnée fournie")
+
+    client = schemas.ClientEntries(
+        client_id=payload.client_id if payload.client_id is not None else user["user_id"],
+        entries=payload.entries,
+    )
+    summaries, _ = summarize([client])
+    return summaries[0]
+
 
-    if not entries:
+def check_clients(db: Session, user: dict, client_ids):
+    """
+    Un client ne peut envoyer que ses propres données, un coach celles de
+    ses clients (users.coach_id). Tout autre rôle est refusé.
+    """
+    client_ids = set(client_ids)
+    if user["role"] == "client":
+        allowed = client_ids <= {user["user_id"]}
+    elif user["role"] == "coach":
+        allowed = coach_owns(db, user["user_id"], client_ids)
+    else:
+        allowed = False
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Accès interdit")
+
+
+# -------------------------------------------------------
+# 🔵 ROUTE : Calcul groupé (N clients, enregistrement optionnel)
+# -------------------------------------------------------
+@app.post("/compliance/batch", response_model=schemas.BatchResult)
+def calculate_batch(
+    payload: schemas.BatchRequest,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Taux quotidiens et moyennes de plusieurs clients en un appel, calculés
+    en une seule opération vectorisée. Avec `save`, toutes les journées
+    sont enregistrées en une insertion groupée (une transaction).
+    """
+    if not payload.clients:
         raise HTTPException(status_code=400, detail="Aucune donnée fournie")
+    if len(payload.clients) > MAX_BATCH_CLIENTS:
+        raise HTTPException(status_code=413, detail=f"Maximum {MAX_BATCH_CLIENTS} clients par appel")
+    check_clients(db, user, (c.client_id for c in payload.clients))
+
+    summaries, rows = summarize(payload.clients)
+
+    saved = 0
+    if payload.save:
+        saved = save_records(db, rows)
+        db.commit()
+
+    return {"clients": summaries, "saved": saved}
+
+
+# -------------------------------------------------------
+# 🔵 ROUTE : Calcul groupé en flux NDJSON (job nocturne)
+# -------------------------------------------------------
+@app.post("/compliance/batch/ndjson")
+async def calculate_batch_ndjson(
+    request: Request,
+    save: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Corps NDJSON : une ligne = {"client_id": ..., "entries": [...]}.
+    1. Le corps est lu au fil de l'eau, chaque ligne validée et les droits
+       vérifiés par paquets de NDJSON_CHUNK_CLIENTS (422 / 403 avant tout
+       calcul) ; les lignes sont mises de côté dans un fichier temporaire.
+    2. Réponse NDJSON en flux : un WeeklySummary par ligne, envoyé paquet
+       par paquet, puis {"saved": n}. L'enregistrement (`save`) est fait
+       en une seule transaction : tout ou rien.
+    La mémoire reste bornée quelle que soit la taille du corps.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_BYTES)
+    try:
+        line_no = 0
+        ids = set()
+        async for line in ndjson_lines(request):
+            line_no += 1
+            try:
+                client = schemas.ClientEntries.model_validate_json(line)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"Ligne {line_no} invalide : {e.errors()[0]['msg']}")
+            ids.add(client.client_id)
+            spool.write(line.strip() + b"\n")
+
+            if line_no % NDJSON_CHUNK_CLIENTS == 0:
+                await run_in_threadpool(check_clients, db, user, ids)
+                ids = set()
 
-    rates = []
-    for e in entries:
-        done = sum([
-            e["meal_morning_done"],
-            e["meal_noon_done"],
-            e["meal_evening_done"],
-            e["workout_done"],
-        ])
-        rate = round((done / 4) * 100, 2)
-        rates.append(rate)
-
-    avg = round(sum(rates) / len(rates), 2)
-
-    return {
-        "client_id": client_id,
-        "average_compliance": avg,
-        "daily_rates": rates,
-    }
+        if not line_no:
+            raise HTTPException(status_code=400, detail="Aucune donnée fournie")
+        await run_in_threadpool(check_clients, db, user, ids)
+    except BaseException:
+        spool.close()
+        raise
+
+    return StreamingResponse(
+        stream_batch(spool, save, NDJSON_CHUNK_CLIENTS), media_type="application/x-ndjson"
+    )
+
+
+async def ndjson_lines(request: Request):
+    """
+    Lignes non vides du corps, sans le charger entièrement en mémoire.
+    Une ligne > NDJSON_MAX_LINE_BYTES ou un corps > NDJSON_MAX_BODY_BYTES
+    est refusé (413) dès que la limite est franchie.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > NDJSON_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Corps limité à {NDJSON_MAX_BODY_BYTES} octets")
+
+    received = 0
+    line_no = 0
+    buffer = b""
+    async for data in request.stream():
+        received += len(data)
+        if received > NDJSON_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Corps limité à {NDJSON_MAX_BODY_BYTES} octets")
+
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if len(line) > NDJSON_MAX_LINE_BYTES:
+                raise HTTPException(
+                    status_code=413, detail=f"Ligne {line_no} : limitée à {NDJSON_MAX_LINE_BYTES} octets"
+                )
+            if line.strip():
+                yield line
+        # Ligne en cours sans fin de ligne : bornée elle aussi
+        if len(buffer) > NDJSON_MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=413, detail=f"Ligne {line_no + 1} : limitée à {NDJSON_MAX_LINE_BYTES} octets"
+            )
+    if buffer.strip():
+        yield buffer
+
+
+# -------------------------------------------------------
+# 🔵 ROUTES : Historique agrégé (jour / semaine / mois)
+# -------------------------------------------------------
+def history_response(stmt, db: Session, format: str):
+    """Liste JSON, ou flux NDJSON (curseur serveur) pour les longues périodes."""
+    if format == "ndjson":
+        return StreamingResponse(stream_history(stmt), media_type="application/x-ndjson")
+    return fetch_history(db, stmt)
+
+
+@app.get("/compliance/history/client/{client_id}")
+def get_client_history(
+    client_id: int,
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    [{client_id, period, records, average_compliance, min_compliance,
+    max_compliance}] par période, triés par date.
+    """
+    # Le client lui-même, ou son coach (users.coach_id)
+    if user["user_id"] != client_id and not (
+        user["role"] == "coach" and coach_owns(db, user["user_id"], [client_id])
+    ):
+        raise HTTPException(status_code=403, detail="Accès interdit")
+
+    stmt = history_query(bucket, client_id=client_id, date_from=date_from, date_to=date_to)
+    return history_response(stmt, db, format)
+
+
+@app.get("/compliance/history/coach/{coach_id}")
+def get_coach_history(
+    coach_id: int,
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    by_client: bool = False,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Série de tous les clients du coach (+ nombre de clients par période),
+    ou une série par client avec `?by_client=true`.
+    """
+    if user["role"] != "coach" or user["user_id"] != coach_id:
+        raise HTTPException(status_code=403, detail="Accès interdit")
+
+    stmt = history_query(
+        bucket, coach_id=coach_id, date_from=date_from, date_to=date_to, by_client=by_client
+    )
+    return history_response(stmt, db, format)
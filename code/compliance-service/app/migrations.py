@@ -0,0 +1,17 @@
+# app/migrations.py
+from sqlalchemy import text
+
+# -----------------------------------------------------------
+# 🧱 Évolutions de schéma idempotentes
+# (create_all ne modifie pas les tables déjà existantes)
+# -----------------------------------------------------------
+MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS ix_compliance_client_created ON compliance_records (client_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS brin_compliance_created_at ON compliance_records USING brin (created_at)",
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
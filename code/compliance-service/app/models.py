@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy import Column, Integer, Float, DateTime, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from .db import Base
@@ -18,3 +18,10 @@ class ComplianceRecord(Base):
 
     # Date de création (timestamp)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Historique d'un client sur une période
+        Index("ix_compliance_client_created", "client_id", "created_at"),
+        # Plages de dates sur toute la table (lignes insérées dans l'ordre)
+        Index("brin_compliance_created_at", "created_at", postgresql_using="brin"),
+    )
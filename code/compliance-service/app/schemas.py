@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class DailyEntry(BaseModel):
     meal_morning_done: bool
@@ -25,3 +25,26 @@ class ComplianceRecordCreate(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# -------------------------------------------------------
+# 🔵 Calcul groupé (plusieurs clients en un appel)
+# -------------------------------------------------------
+class WeeklyRequest(BaseModel):
+    client_id: Optional[int] = None     # par défaut : utilisateur du token
+    entries: List[DailyEntry]
+
+
+class ClientEntries(BaseModel):
+    client_id: int
+    entries: List[DailyEntry]
+
+
+class BatchRequest(BaseModel):
+    clients: List[ClientEntries]
+    save: bool = False                  # enregistrer chaque journée
+
+
+class BatchResult(BaseModel):
+    clients: List[WeeklySummary]
+    saved: int
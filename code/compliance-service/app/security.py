@@ -1,31 +1,12 @@
 # app/security.py
-from jose import jwt, JWTError
-from fastapi import HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fitnessbro_auth import TokenVerifier
 
 JWT_SECRET = "change-me"   # Même clé que auth-service
 JWT_ALG = "HS256"
 
-auth_scheme = HTTPBearer()
+# Vérification partagée (shared/fitnessbro_auth) : les claims déjà
+# vérifiés sont mis en cache, un même jeton n'est décodé qu'une fois.
+verifier = TokenVerifier(JWT_SECRET, JWT_ALG, require_role=False)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-
-        user_id = payload.get("sub")
-        role = payload.get("role")
-
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token invalide : 'sub' manquant"
-            )
-
-        return {"user_id": int(user_id), "role": role}
-
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide ou expiré"
-        )
+# Dépendance FastAPI → {"user_id": int, "role": str | None}
+verify_token = verifier.dependency
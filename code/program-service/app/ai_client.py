@@ -2,7 +2,8 @@
 
 import os
 import json
-import openai  # Version >= 1.0
+
+from . import http_client
 
 # -----------------------------------------------------------
 # 🔑 Récupération de la clé API (ajoute OPENAI_API_KEY dans .env)
@@ -12,7 +13,23 @@ API_KEY = os.getenv("OPENAI_API_KEY")
 if not API_KEY:
     print("⚠️ Avertissement : OPENAI_API_KEY n'est pas défini dans les variables d'environnement")
 
-client = openai.OpenAI(api_key=API_KEY)
+# Surchargeable pour tester contre un serveur local
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_MODEL = "gpt-4o-mini"  # ou "gpt-4o" si tu veux plus précis
+
+
+async def chat_completion(messages: list, temperature: float = 0, json_mode: bool = False) -> str:
+    """Appel /chat/completions via la couche HTTP partagée, retourne le texte."""
+    payload = {"model": OPENAI_MODEL, "messages": messages, "temperature": temperature}
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+
+    data = await http_client.post_json(
+        f"{OPENAI_BASE_URL}/chat/completions",
+        payload,
+        headers={"Authorization": f"Bearer {API_KEY}"},
+    )
+    return data["choices"][0]["message"]["content"].strip()
 
 SYSTEM_PROMPT = """
 Tu es un assistant expert en nutrition.
@@ -39,21 +56,161 @@ EXIGENCES :
 - pas d'autres champs que "items" et "total_calories"
 """
 
-def ask_nutrition_ai(meal_text: str) -> dict:
+async def ask_nutrition_ai(meal_text: str) -> dict:
     """Appelle GPT pour analyser un repas et renvoyer un JSON calories."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # ou "gpt-4o" si tu veux plus précis
-            messages=[
+        raw = await chat_completion(
+            [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": meal_text},
             ],
             temperature=0.1,
         )
-
-        raw = response.choices[0].message.content.strip()
         return json.loads(raw)
 
     except Exception as e:
         print("🔴 ERREUR IA:", e)
         return {}  # fallback
+
+
+# -----------------------------------------------------------
+# 📦 Analyse groupée : plusieurs repas dans un seul prompt
+# -----------------------------------------------------------
+BATCH_SYSTEM_PROMPT = """
+Tu es un assistant expert en nutrition.
+Tu reçois un objet JSON dont chaque clé identifie un repas écrit librement, par exemple :
+
+{"m0": "250g poulet, 100g riz", "m1": "2 oeufs, 1 banane"}
+
+Tu dois retourner STRICTEMENT un objet JSON avec exactement les mêmes clés :
+
+{
+  "m0": {
+    "foods": [
+      {"name": "250g poulet", "calories": 412},
+      {"name": "100g riz", "calories": 130}
+    ],
+    "meal_calories": 542
+  },
+  "m1": {
+    "foods": [
+      {"name": "2 oeufs", "calories": 156},
+      {"name": "1 banane", "calories": 105}
+    ],
+    "meal_calories": 261
+  }
+}
+
+EXIGENCES :
+- calories réalistes selon la portion
+- une entrée par clé reçue, sans en ajouter ni en oublier
+- pas de texte supplémentaire autour du JSON
+- pas d'autres champs que "foods" et "meal_calories"
+"""
+
+
+async def ask_nutrition_batch(meals: dict) -> dict:
+    """
+    Analyse plusieurs repas en un seul appel GPT.
+    `meals` = {"m0": "texte repas", ...} → {"m0": {...}, ...} (non vérifié).
+    """
+    raw = await chat_completion(
+        [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(meals, ensure_ascii=False)},
+        ],
+        json_mode=True,
+    )
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("Réponse IA groupée non objet JSON")
+    return data
+
+
+def check_meal_details(entry) -> dict | None:
+    """
+    Vérifie une entrée renvoyée par l'IA et la normalise au format MealDetails.
+    Retourne None si l'entrée est inutilisable.
+    """
+    if not isinstance(entry, dict) or not isinstance(entry.get("foods"), list):
+        return None
+
+    foods = []
+    for food in entry["foods"]:
+        if not isinstance(food, dict):
+            return None
+        name = food.get("name")
+        calories = food.get("calories")
+        if not isinstance(name, str) or not isinstance(calories, (int, float)):
+            return None
+        if calories < 0:
+            return None
+        foods.append({"name": name, "calories": float(calories)})
+
+    if not foods:
+        return None
+
+    total = entry.get("meal_calories")
+    if not isinstance(total, (int, float)) or total < 0:
+        total = sum(f["calories"] for f in foods)
+
+    return {"foods": foods, "meal_calories": round(float(total), 2)}
+
+
+# -----------------------------------------------------------
+# 🥕 Valeurs nutritionnelles par ingrédient (cache par aliment)
+# -----------------------------------------------------------
+INGREDIENT_SYSTEM_PROMPT = """
+Tu es un assistant expert en nutrition.
+Tu reçois un objet JSON dont chaque clé identifie un aliment, par exemple :
+
+{"m0": "poulet", "m1": "avocat"}
+
+Pour chaque aliment, retourne STRICTEMENT un objet JSON avec les mêmes clés :
+
+{
+  "m0": {"kcal_per_100g": 165, "kcal_per_unit": null},
+  "m1": {"kcal_per_100g": 160, "kcal_per_unit": 240}
+}
+
+EXIGENCES :
+- "kcal_per_100g" = calories pour 100 g (ou 100 ml pour un liquide)
+- "kcal_per_unit" = calories d'une pièce / portion usuelle, null si non pertinent
+- pas de texte supplémentaire autour du JSON
+"""
+
+
+async def ask_ingredients_batch(foods: dict) -> dict:
+    """
+    Demande les calories de référence de plusieurs aliments en un appel.
+    `foods` = {"m0": "poulet", ...} → {"m0": {...}, ...} (non vérifié).
+    """
+    raw = await chat_completion(
+        [
+            {"role": "system", "content": INGREDIENT_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(foods, ensure_ascii=False)},
+        ],
+        json_mode=True,
+    )
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("Réponse IA ingrédients non objet JSON")
+    return data
+
+
+def check_ingredient(entry) -> dict | None:
+    """Vérifie les calories de référence d'un aliment, None si inutilisable."""
+    if not isinstance(entry, dict):
+        return None
+
+    out = {}
+    for field in ("kcal_per_100g", "kcal_per_unit"):
+        value = entry.get(field)
+        if isinstance(value, (int, float)) and value >= 0:
+            out[field] = float(value)
+        else:
+            out[field] = None
+
+    if out["kcal_per_100g"] is None and out["kcal_per_unit"] is None:
+        return None
+    return out
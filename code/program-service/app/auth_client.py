@@ -0,0 +1,34 @@
+# app/auth_client.py
+import os
+
+from . import http_client
+
+# -----------------------------------------------------------
+# 🔗 auth-service (profils utilisateurs)
+# -----------------------------------------------------------
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://127.0.0.1:8001").rstrip("/")
+AUTH_DEADLINE = float(os.getenv("AUTH_DEADLINE", "3"))
+
+
+async def user_emails(user_ids) -> dict:
+    """
+    {user_id: email} en un seul appel POST /auth/users/batch.
+    Best effort : en cas d'échec, {} (l'email reste vide dans la réponse).
+    """
+    ids = sorted(set(user_ids))
+    if not ids:
+        return {}
+
+    try:
+        data = await http_client.post_json(
+            f"{AUTH_SERVICE_URL}/auth/users/batch",
+            {"ids": ids},
+            deadline=AUTH_DEADLINE,
+        )
+        return {u["id"]: u["email"] for u in data["users"]}
+    except http_client.OutboundError as e:
+        print("⚠️ auth-service indisponible, emails non résolus :", e)
+    except (ValueError, KeyError, TypeError) as e:
+        # Réponse non JSON (page d'erreur d'un proxy) ou incomplète
+        print("⚠️ Réponse auth-service invalide, emails non résolus :", repr(e))
+    return {}
@@ -0,0 +1,202 @@
+# app/cache.py
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+
+import redis
+
+from .redis_client import redis_client
+
+# -----------------------------------------------------------
+# ⚙️ Réglages du cache local (surchargeables via .env)
+# -----------------------------------------------------------
+LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", "2048"))
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "300"))
+
+# Valeur stockée pour "on sait qu'il n'y a rien" (cache négatif)
+_NEGATIVE = "__none__"
+_MISSING = object()
+
+
+class TwoTierCache:
+    """
+    Cache à deux niveaux pour le program-service :
+
+    1. LRU en mémoire (borné, TTL court) → aucun aller-retour réseau
+    2. Redis (TTL long) partagé entre workers
+
+    - les valeurs sont sérialisées en JSON
+    - `None` est mis en cache négatif (`negative_ttl`) pour ne pas
+      relancer un appel externe qui vient d'échouer / ne rien trouver
+    - `get_or_load` garantit un seul chargement simultané par clé
+    - une panne Redis est traitée comme un miss (jamais une erreur)
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        negative_ttl: int = 60,
+        local_maxsize: int = LOCAL_CACHE_SIZE,
+        local_ttl: float = LOCAL_CACHE_TTL,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_maxsize = local_maxsize
+        self.local_ttl = local_ttl
+
+        self._local = OrderedDict()   # key -> (expire_at, value)
+        self._inflight = {}           # key -> Future
+        self.counters = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "redis_errors": 0,
+        }
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    # ---------------- Niveau 1 : mémoire ----------------
+    def _local_get(self, key: str):
+        entry = self._local.get(key)
+        if entry is None:
+            return _MISSING
+
+        expire_at, value = entry
+        if expire_at < time.monotonic():
+            del self._local[key]
+            return _MISSING
+
+        self._local.move_to_end(key)
+        return value
+
+    def _local_set(self, key: str, value, ttl: float):
+        self._local[key] = (time.monotonic() + min(ttl, self.local_ttl), value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_maxsize:
+            self._local.popitem(last=False)
+
+    def _count_hit(self, tier: str, value):
+        self.counters["negative_hits" if value is None else tier] += 1
+
+    # ---------------- Niveau 2 : Redis ----------------
+    async def _redis_mget(self, keys: list) -> list:
+        try:
+            return await asyncio.to_thread(
+                redis_client.mget, [self._redis_key(k) for k in keys]
+            )
+        except redis.RedisError as e:
+            print("🔴 ERREUR REDIS:", e)
+            self.counters["redis_errors"] += 1
+            return [None] * len(keys)
+
+    async def _redis_set_many(self, mapping: dict):
+        def store():
+            pipe = redis_client.pipeline()
+            for key, value in mapping.items():
+                if value is None:
+                    pipe.setex(self._redis_key(key), self.negative_ttl, _NEGATIVE)
+                else:
+                    pipe.setex(self._redis_key(key), self.ttl, json.dumps(value))
+            pipe.execute()
+
+        try:
+            await asyncio.to_thread(store)
+        except redis.RedisError as e:
+            print("🔴 ERREUR REDIS:", e)
+            self.counters["redis_errors"] += 1
+
+    # ---------------- API ----------------
+    async def get_many(self, keys: list) -> dict:
+        """
+        Retourne {key: valeur} pour les clés connues (cache négatif → None).
+        Les clés absentes des deux niveaux ne figurent pas dans le résultat.
+        """
+        found = {}
+        remote = []
+        for key in dict.fromkeys(keys):
+            value = self._local_get(key)
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                self._count_hit("local_hits", value)
+                found[key] = value
+
+        if not remote:
+            return found
+
+        for key, raw in zip(remote, await self._redis_mget(remote)):
+            if raw is None:
+                self.counters["misses"] += 1
+                continue
+
+            value = None if raw == _NEGATIVE else json.loads(raw)
+            self._count_hit("redis_hits", value)
+            self._local_set(key, value, self.ttl if value is not None else self.negative_ttl)
+            found[key] = value
+
+        return found
+
+    async def get(self, key: str, default=None):
+        return (await self.get_many([key])).get(key, default)
+
+    async def set_many(self, mapping: dict):
+        """Écrit dans les deux niveaux (None = entrée négative)."""
+        if not mapping:
+            return
+        for key, value in mapping.items():
+            self._local_set(key, value, self.ttl if value is not None else self.negative_ttl)
+        await self._redis_set_many(mapping)
+
+    async def set(self, key: str, value):
+        await self.set_many({key: value})
+
+    async def get_or_load(self, key: str, loader):
+        """
+        Lecture avec chargement unique : si la clé manque, un seul appel à
+        `loader()` (coroutine) est lancé, les appels concurrents l'attendent.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            found = await self.get_many([key])
+            if key in found:
+                return found[key]
+            inflight = self._inflight.get(key)
+
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+            return await inflight
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.counters["loads"] += 1
+            value = await loader()
+            await self.set(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marquée comme lue si personne n'attend
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def stats(self) -> dict:
+        hits = self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["negative_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            "namespace": self.namespace,
+            "local_size": len(self._local),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **self.counters,
+        }
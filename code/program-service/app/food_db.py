@@ -0,0 +1,109 @@
+# app/food_db.py
+import os
+import csv
+import difflib
+from functools import lru_cache
+from pathlib import Path
+
+from .meal_parser import normalize_food
+
+# -----------------------------------------------------------
+# 🥗 Table locale de composition des aliments (FR + EN)
+# -----------------------------------------------------------
+FOOD_DB_PATH = os.getenv("FOOD_DB_PATH", str(Path(__file__).parent / "data" / "foods.csv"))
+
+# Mots ignorés pour la correspondance ("blanc de poulet" ~ "blanc poulet")
+STOPWORDS = {"de", "d", "du", "des", "la", "le", "les", "l", "au", "aux", "a", "en", "of", "the"}
+
+# Correction de fautes de frappe seulement sur des noms assez longs et très
+# proches : sur des clés courtes, difflib confond des aliments différents
+# ("mie" → miel, "pate" → pâtes). Sinon → None → IA.
+FUZZY_CUTOFF = 0.9
+FUZZY_MIN_LENGTH = 6
+
+# Clés qui, sans accents ni pluriel, désignent plusieurs aliments
+# ("pâte", "pâté" et "pâtes" → "pate") : acceptées seulement si le nom
+# saisi est l'une des écritures listées.
+AMBIGUOUS_KEYS = {"pate": {"pâtes", "pates"}}
+
+# Qualificatifs de cuisson / présentation qui ne changent pas l'aliment :
+# seuls ces mots peuvent être retirés en fin de nom ("poulet grillé" → "poulet").
+# Un autre mot ("salade de fruits", "lait de coco") → aliment inconnu → IA.
+# Pas de "cru" / "raw" : la table contient des valeurs cuites (riz 130 kcal,
+# ~360 cru) et "jambon cru" n'est pas du jambon cuit.
+QUALIFIERS = [
+    "grillé", "cuit", "nature", "bio", "frais", "fraîche", "maison",
+    "vapeur", "four", "poêlé", "rôti", "bouilli", "sauté", "surgelé", "égoutté",
+    "grilled", "cooked", "boiled", "steamed", "baked", "fresh", "plain", "organic",
+]
+
+
+def match_key(food: str) -> str:
+    """Clé d'index : nom normalisé sans mots vides."""
+    return " ".join(w for w in normalize_food(food).split() if w not in STOPWORDS)
+
+
+def load_foods(path: str = FOOD_DB_PATH) -> dict:
+    """
+    Charge le CSV en index {match_key: info}, synonymes compris.
+    info = {"name", "kcal_per_100g", "kcal_per_unit", "density"}
+    """
+    index = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            kcal = float(row["kcal_per_100g"])
+            unit_grams = float(row["unit_grams"]) if row.get("unit_grams") else None
+            info = {
+                "name": row["name"],
+                "kcal_per_100g": kcal,
+                "kcal_per_unit": round(kcal * unit_grams / 100, 2) if unit_grams else None,
+                "density": float(row["density"]) if row.get("density") else 1.0,
+            }
+
+            names = [row["name"]] + [s for s in (row.get("synonyms") or "").split("|") if s]
+            for name in names:
+                index.setdefault(match_key(name), info)
+    return index
+
+
+FOODS = load_foods()
+_KEYS = list(FOODS)
+_QUALIFIERS = {match_key(q) for q in QUALIFIERS}
+
+print(f"🥗 Table aliments chargée → {len(_KEYS)} entrées")
+
+
+@lru_cache(maxsize=4096)
+def lookup(food: str) -> dict | None:
+    """
+    Valeurs de référence d'un aliment, None s'il est inconnu.
+    Ordre : nom exact → faute de frappe (difflib, clés ≥ FUZZY_MIN_LENGTH) → nom sans ses
+    qualificatifs finaux ("poulet grillé" → "poulet", "riz basmati bio"
+    → "riz basmati").
+    """
+    key = match_key(food)
+    if not key:
+        return None
+
+    if key in AMBIGUOUS_KEYS:
+        if food.strip().lower() not in AMBIGUOUS_KEYS[key]:
+            return None
+        return FOODS[key]
+
+    if key in FOODS:
+        return FOODS[key]
+
+    if len(key) >= FUZZY_MIN_LENGTH:
+        close = difflib.get_close_matches(key, _KEYS, n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            return FOODS[close[0]]
+
+    words = key.split()
+    while len(words) > 1 and words[-1] in _QUALIFIERS:
+        words.pop()
+        base = " ".join(words)
+        if base in FOODS:
+            return FOODS[base]
+
+    return None
+
@@ -0,0 +1,187 @@
+# app/http_client.py
+import os
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+# -----------------------------------------------------------
+# ⚙️ Réglages des appels sortants (surchargeables via .env)
+# -----------------------------------------------------------
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", "10"))
+HTTP_DEADLINE = float(os.getenv("HTTP_DEADLINE", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", "30"))
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class OutboundError(Exception):
+    """Appel sortant impossible (erreur réseau, statut HTTP, circuit ouvert)."""
+
+
+class CircuitBreaker:
+    """
+    Coupe-circuit par hôte : après `threshold` échecs consécutifs, les
+    appels échouent immédiatement pendant `cooldown` secondes, puis un seul
+    appel d'essai est laissé passer (demi-ouvert).
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+_client = None
+_host_slots = {}
+_breakers = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Client httpx partagé (connexions keep-alive réutilisées)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30,
+            ),
+            timeout=httpx.Timeout(HTTP_DEADLINE, connect=5),
+        )
+    return _client
+
+
+async def aclose():
+    """À appeler à l'arrêt de l'application."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    return _breakers.setdefault(host, CircuitBreaker())
+
+
+def _slots_for(host: str) -> asyncio.Semaphore:
+    return _host_slots.setdefault(host, asyncio.Semaphore(HTTP_HOST_CONCURRENCY))
+
+
+def _backoff(attempt: int, remaining: float) -> float:
+    """Backoff exponentiel avec jitter complet, borné par le temps restant."""
+    return min(random.uniform(0, HTTP_BACKOFF * (2 ** attempt)), max(0.0, remaining))
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    deadline: float = HTTP_DEADLINE,
+    retries: int = HTTP_RETRIES,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Appel HTTP sortant avec :
+    - pool de connexions partagé
+    - au plus HTTP_HOST_CONCURRENCY appels simultanés par hôte
+    - une échéance globale `deadline` (toutes tentatives comprises)
+    - `retries` nouvelles tentatives (réseau, 408/429/5xx) avec jitter
+    - un coupe-circuit par hôte
+    Lève OutboundError si l'appel n'aboutit pas.
+    """
+    host = _host(url)
+    breaker = breaker_for(host)
+    end = time.monotonic() + deadline
+    last_error = None
+
+    for attempt in range(retries + 1):
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+
+        if not breaker.allow():
+            raise OutboundError(f"Circuit ouvert pour {host}")
+
+        try:
+            async with _slots_for(host):
+                response = await get_client().request(
+                    method, url, timeout=remaining, **kwargs
+                )
+        except httpx.TransportError as e:
+            last_error = e
+        except asyncio.CancelledError:
+            breaker.trial_running = False
+            raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                # 4xx "métier" : le service répond, le circuit reste fermé
+                breaker.record_success()
+                if response.is_error:
+                    raise OutboundError(f"{host} → HTTP {response.status_code}")
+                return response
+            last_error = OutboundError(f"{host} → HTTP {response.status_code}")
+
+        breaker.record_failure()
+        if attempt < retries:
+            await asyncio.sleep(_backoff(attempt, end - time.monotonic()))
+
+    raise OutboundError(f"Échec de l'appel vers {host} : {last_error or 'échéance dépassée'}")
+
+
+async def get_json(url: str, **kwargs):
+    return (await request("GET", url, **kwargs)).json()
+
+
+async def post_json(url: str, payload: dict, **kwargs):
+    return (await request("POST", url, json=payload, **kwargs)).json()
+
+
+def stats() -> dict:
+    """État des coupe-circuits par hôte."""
+    return {
+        host: {"state": b.state, "consecutive_failures": b.failures}
+        for host, b in _breakers.items()
+    }
@@ -0,0 +1,100 @@
+# app/ingredients.py
+from .cache import TwoTierCache
+from .meal_engine import meal_key, MealBatcher
+from .meal_parser import parse_meal
+from .ai_client import ask_ingredients_batch, check_ingredient
+from . import food_db
+
+# Les calories de référence d'un aliment ne changent pas : cache long
+INGREDIENT_CACHE_TTL = 60 * 60 * 24 * 30
+
+ingredient_cache = TwoTierCache("ingredient_cache", ttl=INGREDIENT_CACHE_TTL)
+ingredient_batcher = MealBatcher(ask_ingredients_batch, check_ingredient)
+
+
+def ingredient_calories(item, info: dict | None) -> float | None:
+    """Calories d'un Ingredient à partir de ses valeurs de référence."""
+    if not info:
+        return None
+
+    if item.unit == "g" and info.get("kcal_per_100g") is not None:
+        return info["kcal_per_100g"] * item.quantity / 100
+
+    if item.unit == "ml" and info.get("kcal_per_100g") is not None:
+        grams = item.quantity * (info.get("density") or 1.0)
+        return info["kcal_per_100g"] * grams / 100
+
+    if item.unit == "unit" and info.get("kcal_per_unit") is not None:
+        return info["kcal_per_unit"] * item.quantity
+
+    return None
+
+
+def assemble_meal(items: list, infos: dict) -> dict | None:
+    """Construit un MealDetails à partir des ingrédients, None s'il en manque."""
+    if not items:
+        return None
+
+    foods = []
+    for item in items:
+        kcal = ingredient_calories(item, infos.get(item.food))
+        if kcal is None:
+            return None
+        foods.append({"name": item.text, "calories": round(kcal, 1)})
+
+    return {
+        "foods": foods,
+        "meal_calories": round(sum(f["calories"] for f in foods), 2),
+    }
+
+
+def local_meal(meal_text: str) -> dict | None:
+    """MealDetails calculé uniquement depuis la table locale, None si incomplet."""
+    items = parse_meal(meal_text)
+    return assemble_meal(items, {item.food: food_db.lookup(item.food) for item in items})
+
+
+async def get_ingredients(foods: list, timeout: float | None = None) -> dict:
+    """
+    Valeurs de référence de chaque aliment : table locale, puis cache
+    (mémoire → Redis en un MGET), puis un seul prompt groupé pour les
+    aliments encore jamais vus (les échecs sont mis en cache négatif ;
+    un aliment non revenu dans `timeout` est absent, sans cache).
+    Retourne {food: info | None}.
+    """
+    infos = {}
+    unknown = []
+    for food in foods:
+        info = food_db.lookup(food)
+        if info:
+            infos[food] = info
+        else:
+            unknown.append(food)
+
+    if not unknown:
+        return infos
+
+    cached = await ingredient_cache.get_many(unknown)
+    infos.update(cached)
+    misses = [f for f in unknown if f not in cached]
+
+    if misses:
+        print(f"🥕 IA INGRÉDIENTS → {len(misses)} aliment(s) inconnu(s)")
+        found = await ingredient_batcher.analyze_many(misses, timeout)
+        await ingredient_cache.set_many(found)
+        infos.update(found)
+
+    return infos
+
+
+async def meals_from_ingredients(meal_texts: list, timeout: float | None = None) -> dict:
+    """
+    Décompose chaque repas en ingrédients et assemble ses calories depuis
+    le cache par aliment. Retourne {meal_key: details | None} ; None quand
+    un ingrédient reste inconnu (le repas repart alors vers l'IA repas).
+    """
+    parsed = {meal_key(t): parse_meal(t) for t in meal_texts}
+    foods = sorted({item.food for items in parsed.values() for item in items})
+
+    infos = await get_ingredients(foods, timeout)
+    return {key: assemble_meal(items, infos) for key, items in parsed.items()}
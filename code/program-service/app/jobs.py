@@ -0,0 +1,191 @@
+# app/jobs.py
+import os
+import json
+import asyncio
+
+import redis
+
+from .db import SessionLocal
+from . import models, schemas
+from .redis_client import redis_client, blocking_redis_client
+from .nutrition import compute_program_days
+from .program_store import store_days
+
+# -----------------------------------------------------------
+# 📨 File d'attente d'analyse des programmes (liste Redis)
+# -----------------------------------------------------------
+PROGRAM_QUEUE = "program_jobs"
+PROGRAM_EVENTS = "program_events"   # canal pub/sub des fins d'analyse
+
+# Workers lancés dans le process API (0 si workers dédiés : python -m app.jobs)
+PROGRAM_WORKERS = int(os.getenv("PROGRAM_WORKERS", "1"))
+POLL_TIMEOUT = 5
+
+# Un programme n'est en file qu'une fois : clé posée à l'envoi, retirée
+# en fin d'analyse. Si un worker meurt, elle expire après le bail et le
+# prochain requeue_pending le remet en file.
+PROGRAM_JOB_LEASE = int(os.getenv("PROGRAM_JOB_LEASE", "900"))
+
+
+def _job_key(program_id: int) -> str:
+    return f"program_job:{program_id}"
+
+_stop = None
+_tasks = set()
+
+
+def submit_enrichment(program_id: int):
+    """
+    Met l'analyse d'un programme en file, sauf s'il y est déjà (ou en
+    cours d'analyse). Si Redis est indisponible, l'analyse tourne
+    directement dans le process courant.
+    """
+    try:
+        if not redis_client.set(_job_key(program_id), 1, nx=True, ex=PROGRAM_JOB_LEASE):
+            return
+        redis_client.lpush(PROGRAM_QUEUE, program_id)
+    except redis.RedisError as e:
+        print("🔴 ERREUR REDIS (file jobs):", e)
+        task = asyncio.create_task(enrich_program(program_id))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+async def enrich_program(program_id: int) -> str | None:
+    """
+    Analyse les repas d'un programme "pending" et le passe en "ready"
+    (ou "failed"). Idempotent : un programme déjà traité est ignoré.
+    """
+    db = SessionLocal()
+    try:
+        program = db.get(models.Program, program_id)
+        if not program or program.status != "pending":
+            return None
+
+        try:
+            days = [schemas.ProgramCreateDay(**d) for d in program.source_days or []]
+            out_days, week_total = await compute_program_days(days)
+            values = {
+                "day_refs": store_days(db, out_days),
+                "calories": week_total,
+                "status": "ready",
+                "source_days": None,
+            }
+        except Exception as e:
+            print("🔴 ERREUR ANALYSE PROGRAMME:", program_id, e)
+            db.rollback()
+            values = {"status": "failed"}
+
+        # Ne pas écraser un programme modifié (PUT) pendant l'analyse
+        updated = (
+            db.query(models.Program)
+            .filter(models.Program.id == program_id, models.Program.status == "pending")
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        if not updated:
+            return None
+    finally:
+        db.close()
+
+    print(f"✅ Programme {program_id} → {values['status']}")
+    try:
+        redis_client.publish(
+            PROGRAM_EVENTS, json.dumps({"program_id": program_id, "status": values["status"]})
+        )
+    except redis.RedisError as e:
+        print("🔴 ERREUR REDIS (événement):", e)
+    return values["status"]
+
+
+def mark_failed(program_id: int):
+    """Best effort : passe un programme encore "pending" en "failed"."""
+    db = SessionLocal()
+    try:
+        db.query(models.Program).filter(
+            models.Program.id == program_id, models.Program.status == "pending"
+        ).update({"status": "failed"}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print("🔴 ERREUR JOB (statut failed):", program_id, e)
+    finally:
+        db.close()
+
+
+async def worker_loop(stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            item = await asyncio.to_thread(
+                blocking_redis_client.brpop, PROGRAM_QUEUE, POLL_TIMEOUT
+            )
+        except redis.RedisError as e:
+            print("🔴 ERREUR REDIS (worker):", e)
+            await asyncio.sleep(POLL_TIMEOUT)
+            continue
+
+        if item:
+            try:
+                program_id = int(item[1])
+            except ValueError:
+                print("🔴 ERREUR JOB (id invalide):", item[1])
+                continue
+            try:
+                await enrich_program(program_id)
+            except Exception as e:
+                # Erreur base (connexion perdue, sérialisation…) : le worker continue
+                print("🔴 ERREUR JOB PROGRAMME:", program_id, e)
+                await asyncio.to_thread(mark_failed, program_id)
+            finally:
+                try:
+                    redis_client.delete(_job_key(program_id))
+                except redis.RedisError as e:
+                    print("🔴 ERREUR REDIS (fin job):", e)
+
+
+def requeue_pending():
+    """
+    Remet en file les programmes restés "pending" (ex : redémarrage).
+    Ceux encore en file ou en cours d'analyse sont ignorés (clé de job).
+    """
+    db = SessionLocal()
+    try:
+        ids = [
+            pid for (pid,) in
+            db.query(models.Program.id).filter(models.Program.status == "pending")
+        ]
+    finally:
+        db.close()
+
+    for program_id in ids:
+        submit_enrichment(program_id)
+
+
+def start_workers(count: int = PROGRAM_WORKERS):
+    global _stop
+    if count <= 0:
+        return
+
+    _stop = asyncio.Event()
+    requeue_pending()
+    for _ in range(count):
+        task = asyncio.create_task(worker_loop(_stop))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    print(f"👷 {count} worker(s) d'analyse démarré(s)")
+
+
+async def stop_workers():
+    if _stop is not None:
+        _stop.set()
+    if _tasks:
+        await asyncio.wait(list(_tasks), timeout=POLL_TIMEOUT + 1)
+
+
+if __name__ == "__main__":
+    # python -m app.jobs → workers dédiés, scalables indépendamment de l'API
+    async def main():
+        start_workers(max(1, PROGRAM_WORKERS))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
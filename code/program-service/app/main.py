@@ -1,23 +1,39 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 import os
-import json
-import re
-import requests
 
 from .db import Base, engine, get_db
 from . import models, schemas
-from .security import verify_token
-from .redis_client import redis_client
-
-# === OpenAI nouvelle API ===
-from openai import OpenAI
+from .security import verify_token, verifier
+from . import http_client
+from .nutrition import (
+    compute_program_days,
+    patch_program_days,
+    resolve_program_meals,
+    build_program_days,
+    meal_cache,
+)
+from .migrations import run_migrations
+from . import program_store
+from .program_store import render_program, render_programs, block_cache
+from . import jobs
+from .ingredients import ingredient_cache
+from .video_index import get_exercise_video_url, prewarm_videos, video_cache
 
 load_dotenv()
 
+# Taille maximale d'une création groupée
+MAX_BULK_PROGRAMS = int(os.getenv("MAX_BULK_PROGRAMS", "500"))
+
+# Pagination des listes de programmes
+PROGRAM_PAGE_SIZE = int(os.getenv("PROGRAM_PAGE_SIZE", "200"))
+MAX_PROGRAM_PAGE_SIZE = int(os.getenv("MAX_PROGRAM_PAGE_SIZE", "1000"))
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
@@ -27,9 +43,6 @@ if not OPENAI_API_KEY:
 if not YOUTUBE_API_KEY:
     raise RuntimeError("❌ YOUTUBE_API_KEY manquante dans .env")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-
 # ==========================================================
 # 🚀 Initialisation FastAPI
 # ==========================================================
@@ -41,52 +54,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 
-# ==========================================================
-# ▶️ YouTube API – Recherche vidéo exercice
-# ==========================================================
-def search_exercise_video(exercise_name: str) -> str:
-    """
-    Recherche la meilleure vidéo YouTube pour un exercice (démonstration).
-    Retourne l’URL complète.
-    """
-
-    query = f"{exercise_name} exercise proper form"
-
-    url = "https://www.googleapis.com/youtube/v3/search"
-
-    params = {
-        "part": "snippet",
-        "q": query,
-        "key": YOUTUBE_API_KEY,
-        "maxResults": 1,
-        "type": "video",
-        "videoDuration": "short"
-    }
-
-    try:
-        res = requests.get(url, params=params)
-        data = res.json()
+@app.on_event("startup")
+async def start_program_workers():
+    jobs.start_workers()
 
-        if "items" in data and len(data["items"]) > 0:
-            video_id = data["items"][0]["id"]["videoId"]
-            return f"https://www.youtube.com/watch?v={video_id}"
 
-        return ""
-
-    except Exception as e:
-        print("🔴 ERREUR YOUTUBE:", e)
-        return ""
+@app.on_event("shutdown")
+async def shutdown():
+    await jobs.stop_workers()
+    await http_client.aclose()
 
 
+# ==========================================================
+# ▶️ YouTube – Vidéo d'exercice (index persistant)
+# ==========================================================
 @app.get("/program/video/{exercise_name}")
-def get_exercise_video(exercise_name: str):
+async def get_exercise_video(exercise_name: str, db: Session = Depends(get_db)):
     """Endpoint appelé par le frontend pour obtenir une vidéo YouTube"""
-    video_url = search_exercise_video(exercise_name)
+    video_url = await get_exercise_video_url(db, exercise_name)
 
     if not video_url:
         raise HTTPException(404, "Aucune vidéo trouvée")
@@ -94,128 +86,295 @@ def get_exercise_video(exercise_name: str):
     return {"exercise": exercise_name, "video_url": video_url}
 
 
-# ==========================================================
-# 🧠 IA Calories avec Redis Cache
-# ==========================================================
-async def get_meal_calories_ai(meal_text: str) -> dict:
-
-    cache_key = f"meal_cache:{meal_text.lower().strip()}"
-    cached = redis_client.get(cache_key)
-
-    if cached:
-        print("⚡ Redis HIT →", meal_text)
-        return json.loads(cached)
-
-    print("🧠 IA HIT →", meal_text)
+@app.post("/program/videos/prewarm")
+async def prewarm_exercise_videos(db: Session = Depends(get_db), user=Depends(verify_token)):
+    """
+    Indexe d'un coup les vidéos de tous les exercices des programmes.
+    Réservé aux coachs : chaque appel consomme du quota YouTube.
+    """
+    if user["role"] != "coach":
+        raise HTTPException(403, "Accès interdit")
+    return await prewarm_videos(db)
 
-    prompt = f"""
-Analyse précisément les calories pour chaque aliment dans:
 
-"{meal_text}"
+# ==========================================================
+# 🩺 Health Check
+# ==========================================================
+@app.get("/program/health")
+def health():
+    return {"status": "ok", "service": "program-service"}
 
-Retourne STRICTEMENT un JSON comme ceci:
 
-{{
-  "foods": [
-    {{"name": "250g poulet", "calories": 415}}
-  ],
-  "meal_calories": 415
-}}
+@app.get("/program/cache/stats")
+def cache_stats():
+    """Compteurs hit/miss des caches mémoire + Redis, état des coupe-circuits."""
+    return {
+        "caches": [c.stats() for c in (meal_cache, ingredient_cache, video_cache, block_cache)],
+        "outbound": http_client.stats(),
+        "auth_tokens": verifier.cache.stats(),
+    }
 
-Règles :
-- calories selon portion
-- rien hors JSON
-"""
 
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
+# ==========================================================
+# ➕ CREATE PROGRAM
+# ==========================================================
+@app.post("/program", response_model=schemas.ProgramOut, status_code=201)
+async def create_program(
+    payload: schemas.ProgramCreate, background: bool = False, db: Session = Depends(get_db)
+):
+    """
+    `?background=true` : le programme est enregistré tout de suite en
+    "pending" et l'analyse des calories part dans la file des workers
+    (suivi via GET /program/{id}/status ou le canal Redis program_events).
+    """
+    if background:
+        program = models.Program(
+            coach_id=payload.coach_id,
+            client_id=payload.client_id,
+            title=payload.title,
+            notes=payload.notes,
+            day_refs=[],
+            calories=0.0,
+            status="pending",
+            source_days=[day.dict() for day in payload.days],
         )
+        db.add(program)
+        db.commit()
+        db.refresh(program)
 
-        raw = resp.choices[0].message.content.strip()
+        jobs.submit_enrichment(program.id)
+        return await render_program(db, program)
 
-        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if not json_match:
-            raise ValueError("Réponse IA non JSON")
+    out_days, week_total = await compute_program_days(payload.days)
 
-        data = json.loads(json_match.group(0))
-
-        redis_client.setex(cache_key, 60 * 60 * 24, json.dumps(data))
-        return data
+    program = models.Program(
+        coach_id=payload.coach_id,
+        client_id=payload.client_id,
+        title=payload.title,
+        notes=payload.notes,
+        day_refs=program_store.store_days(db, out_days),
+        calories=week_total
+    )
 
-    except Exception as e:
-        print("🔴 ERREUR IA:", e)
+    db.add(program)
+    db.commit()
+    db.refresh(program)
 
-        items = [i.strip() for i in re.split(r"[,\n;]+", meal_text) if i.strip()]
-        return {
-            "foods": [{"name": item, "calories": 120.0} for item in items],
-            "meal_calories": float(120 * len(items))
-        }
+    return program_store.program_out(program, out_days)
 
 
 # ==========================================================
-# 🛠️ Meal Details
+# 📦 CREATE PROGRAMS (bulk : un modèle → N clients)
 # ==========================================================
-async def compute_meal_details(meals: dict):
-    details = {}
-    day_total = 0.0
+@app.post("/program/bulk", response_model=schemas.ProgramBulkResult, status_code=201)
+async def create_programs_bulk(payload: schemas.ProgramBulkCreate, db: Session = Depends(get_db)):
+    """
+    Crée d'un coup un programme par client à partir d'un modèle (et/ou une
+    liste de programmes complets). Les repas identiques de tout le lot ne
+    sont analysés qu'une fois, et toutes les lignes sont insérées en une
+    seule requête / transaction. Retourne un résultat par élément.
+    """
+    batch = []
+    if payload.template:
+        base = payload.template.dict(exclude={"days"})
+        batch += [
+            schemas.ProgramCreate(**base, client_id=cid, days=payload.template.days)
+            for cid in payload.client_ids
+        ]
+    elif payload.client_ids:
+        raise HTTPException(400, "client_ids nécessite un 'template'")
+    from_template = len(batch)
+    batch += payload.programs
+
+    if not batch:
+        raise HTTPException(400, "Aucun programme fourni")
+    if len(batch) > MAX_BULK_PROGRAMS:
+        raise HTTPException(413, f"Maximum {MAX_BULK_PROGRAMS} programmes par lot")
+
+    items = []
+    valid = []
+    seen_clients = set()
+    for index, item in enumerate(batch):
+        error = None
+        if not item.days:
+            error = "Aucun jour dans le programme"
+        elif index < from_template and item.client_id in seen_clients:
+            error = "Client en double dans le lot"
+        seen_clients.add(item.client_id)
+
+        if error:
+            items.append(schemas.ProgramBulkItem(
+                index=index, client_id=item.client_id, status="error", detail=error
+            ))
+        else:
+            valid.append((index, item))
+
+    # Une seule vague d'analyse pour tous les repas distincts du lot
+    resolved = await resolve_program_meals(
+        [text for _, item in valid for day in item.days for text in day.meals.values()]
+    )
 
-    for meal_name, meal_text in meals.items():
-        result = await get_meal_calories_ai(meal_text)
-        details[meal_name] = result
-        day_total += result["meal_calories"]
+    rows = []
+    blocks = {}
+    for _, item in valid:
+        out_days, week_total = build_program_days(item.days, resolved)
+        day_refs, day_blocks = program_store.split_days(out_days)
+        blocks.update(day_blocks)
+        rows.append({
+            "coach_id": item.coach_id,
+            "client_id": item.client_id,
+            "title": item.title,
+            "notes": item.notes,
+            "day_refs": day_refs,
+            "calories": week_total,
+            "status": "ready",
+        })
 
-    return details, round(day_total, 2)
+    if rows:
+        try:
+            # Les jours identiques du lot ne sont écrits qu'une fois
+            program_store.save_blocks(db, blocks)
+            ids = db.scalars(
+                insert(models.Program).returning(
+                    models.Program.id, sort_by_parameter_order=True
+                ),
+                rows,
+            ).all()
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            print("🔴 ERREUR BULK INSERT:", e)
+            ids = [None] * len(rows)
+
+        for (index, item), program_id in zip(valid, ids):
+            items.append(schemas.ProgramBulkItem(
+                index=index,
+                client_id=item.client_id,
+                status="created" if program_id else "error",
+                program_id=program_id,
+                detail=None if program_id else "Erreur d'enregistrement",
+            ))
+
+    items.sort(key=lambda i: i.index)
+    created = sum(1 for i in items if i.status == "created")
+    return {"created": created, "errors": len(items) - created, "items": items}
 
 
 # ==========================================================
-# 🩺 Health Check
+# 🧩 TEMPLATES (jours partagés, un seul stockage pour N clients)
 # ==========================================================
-@app.get("/program/health")
-def health():
-    return {"status": "ok", "service": "program-service"}
-
-
-# ==========================================================
-# ➕ CREATE PROGRAM
-# ==========================================================
-@app.post("/program", response_model=schemas.ProgramOut, status_code=201)
-async def create_program(payload: schemas.ProgramCreate, db: Session = Depends(get_db)):
-
-    week_total = 0
-    out_days = []
-
-    for day in payload.days:
-        meal_details, kcal = await compute_meal_details(day.meals)
+def template_out(template: models.ProgramTemplate, days: list) -> dict:
+    return {
+        "id": template.id,
+        "coach_id": template.coach_id,
+        "title": template.title,
+        "notes": template.notes,
+        "days": days,
+        "calories": template.calories or 0.0,
+    }
 
-        exercises = getattr(day, "exercises", []) or []
 
-        out_days.append({
-            "day": day.day,
-            "meals": meal_details,
-            "workout": day.workout or "Repos",
-            "daily_calories": kcal,
-            "exercises": [ex.dict() for ex in exercises]
-        })
+@app.post("/program/templates", response_model=schemas.ProgramTemplateOut, status_code=201)
+async def create_template(payload: schemas.ProgramTemplateCreate, db: Session = Depends(get_db)):
+    """Analyse une fois les jours du modèle et les enregistre en blocs partagés."""
+    if not payload.days:
+        raise HTTPException(400, "Aucun jour dans le modèle")
 
-        week_total += kcal
+    out_days, week_total = await compute_program_days(payload.days)
 
-    program = models.Program(
+    template = models.ProgramTemplate(
         coach_id=payload.coach_id,
-        client_id=payload.client_id,
         title=payload.title,
         notes=payload.notes,
-        days=out_days,
-        calories=round(week_total, 2)
+        day_refs=program_store.store_days(db, out_days),
+        calories=week_total,
     )
-
-    db.add(program)
+    db.add(template)
     db.commit()
-    db.refresh(program)
+    db.refresh(template)
 
-    return program
+    return template_out(template, out_days)
+
+
+@app.get("/program/templates/{template_id}", response_model=schemas.ProgramTemplateOut)
+async def get_template(template_id: int, db: Session = Depends(get_db)):
+    template = db.get(models.ProgramTemplate, template_id)
+    if not template:
+        raise HTTPException(404, "Modèle introuvable")
+
+    days = (await program_store.assemble_days(db, [template.day_refs]))[0]
+    return template_out(template, days)
+
+
+@app.post(
+    "/program/templates/{template_id}/assign",
+    response_model=schemas.ProgramBulkResult,
+    status_code=201,
+)
+async def assign_template(
+    template_id: int, payload: schemas.ProgramTemplateAssign, db: Session = Depends(get_db)
+):
+    """
+    Attribue le modèle à plusieurs clients : aucune analyse, aucune copie
+    des jours (les programmes pointent vers le modèle), une seule insertion.
+    """
+    template = db.get(models.ProgramTemplate, template_id)
+    if not template:
+        raise HTTPException(404, "Modèle introuvable")
+
+    if not payload.client_ids:
+        raise HTTPException(400, "Aucun client fourni")
+    if len(payload.client_ids) > MAX_BULK_PROGRAMS:
+        raise HTTPException(413, f"Maximum {MAX_BULK_PROGRAMS} programmes par lot")
+
+    items = []
+    positions = {}   # client_id → index de sa première occurrence
+    for index, client_id in enumerate(payload.client_ids):
+        if client_id in positions:
+            items.append(schemas.ProgramBulkItem(
+                index=index, client_id=client_id, status="error",
+                detail="Client en double dans le lot",
+            ))
+        else:
+            positions[client_id] = index
+    client_ids = list(positions)
+
+    rows = [
+        {
+            "coach_id": template.coach_id,
+            "client_id": client_id,
+            "title": payload.title or template.title,
+            "notes": payload.notes if payload.notes is not None else template.notes,
+            "template_id": template.id,
+            "calories": template.calories,
+            "status": "ready",
+        }
+        for client_id in client_ids
+    ]
+
+    try:
+        ids = db.scalars(
+            insert(models.Program).returning(models.Program.id, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print("🔴 ERREUR ASSIGNATION MODÈLE:", e)
+        ids = [None] * len(rows)
+
+    for client_id, program_id in zip(client_ids, ids):
+        items.append(schemas.ProgramBulkItem(
+            index=positions[client_id],
+            client_id=client_id,
+            status="created" if program_id else "error",
+            program_id=program_id,
+            detail=None if program_id else "Erreur d'enregistrement",
+        ))
+
+    items.sort(key=lambda i: i.index)
+    created = sum(1 for i in items if i.status == "created")
+    return {"created": created, "errors": len(items) - created, "items": items}
 
 
 # ==========================================================
@@ -223,6 +382,15 @@ async def create_program(payload: schemas.ProgramCreate, db: Session = Depends(g
 # ==========================================================
 @app.get("/program/{program_id}", response_model=schemas.ProgramOut)
 async def get_program(program_id: int, db: Session = Depends(get_db)):
+    program = db.get(models.Program, program_id)
+    if not program:
+        raise HTTPException(404, "Programme introuvable")
+    return await render_program(db, program)
+
+
+@app.get("/program/{program_id}/status", response_model=schemas.ProgramStatus)
+async def get_program_status(program_id: int, db: Session = Depends(get_db)):
+    """Suivi léger d'un programme créé en arrière-plan."""
     program = db.get(models.Program, program_id)
     if not program:
         raise HTTPException(404, "Programme introuvable")
@@ -242,14 +410,66 @@ async def get_programs_by_client(
         raise HTTPException(404, "Aucun programme trouvé")
 
     if user["user_id"] == client_id:
-        return programs
+        return await render_programs(db, programs)
 
     if user["role"] == "coach" and any(p.coach_id == user["user_id"] for p in programs):
-        return programs
+        return await render_programs(db, programs)
 
     raise HTTPException(403, "Accès interdit")
 
 
+# ==========================================================
+# 📋 GET Programs by coach (résumés paginés)
+# ==========================================================
+@app.get("/programs/coach/{coach_id}", response_model=list[schemas.ProgramSummary])
+async def get_programs_by_coach(
+    coach_id: int,
+    response: Response,
+    after: int | None = None,
+    limit: int = Query(PROGRAM_PAGE_SIZE, ge=1, le=MAX_PROGRAM_PAGE_SIZE),
+    client_id: int | None = None,
+    status: str | None = None,
+    q: str | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Programmes d'un coach, sans les jours (id, client, titre, calories, statut).
+    Pagination par curseur : `?after=<dernier id>` ; le curseur de la page
+    suivante est renvoyé dans l'en-tête X-Next-Cursor (absent en fin de liste).
+    Filtres : client_id, status, q (titre contient).
+    """
+    if user["role"] != "coach" or user["user_id"] != coach_id:
+        raise HTTPException(403, "Accès interdit")
+
+    P = models.Program
+    stmt = select(P.id, P.client_id, P.title, P.calories, P.status).where(P.coach_id == coach_id)
+
+    if client_id is not None:
+        stmt = stmt.where(P.client_id == client_id)
+    if status:
+        stmt = stmt.where(P.status == status)
+    if q:
+        stmt = stmt.where(P.title.ilike(f"%{q}%"))
+    if after is not None:
+        stmt = stmt.where(P.id > after)
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = db.execute(stmt.order_by(P.id).limit(limit + 1)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+    return [
+        schemas.ProgramSummary(
+            id=r.id, client_id=r.client_id, title=r.title,
+            calories=r.calories or 0.0, status=r.status,
+        )
+        for r in rows
+    ]
+
+
 # ==========================================================
 # ✏️ UPDATE Program
 # ==========================================================
@@ -262,34 +482,62 @@ async def update_program(
     if not program:
         raise HTTPException(404, "Programme introuvable")
 
-    week_total = 0
-    out_days = []
-
-    for day in payload.days:
-        meal_details, kcal = await compute_meal_details(day.meals)
-        exercises = getattr(day, "exercises", []) or []
-
-        out_days.append({
-            "day": day.day,
-            "meals": meal_details,
-            "workout": day.workout or "Repos",
-            "daily_calories": kcal,
-            "exercises": [ex.dict() for ex in exercises]
-        })
-
-        week_total += kcal
+    # Les repas dont le texte n'a pas changé ne sont pas réanalysés
+    out_days, week_total = await compute_program_days(
+        payload.days, previous_days=await program_store.program_days(db, program)
+    )
 
     program.title = payload.title
     program.notes = payload.notes
     program.client_id = payload.client_id
     program.coach_id = payload.coach_id
-    program.days = out_days
-    program.calories = round(week_total, 2)
+    program_store.set_program_days(db, program, out_days)
+    program.calories = week_total
+    program.status = "ready"
+    program.source_days = None
 
     db.commit()
     db.refresh(program)
 
-    return program
+    return program_store.program_out(program, out_days)
+
+
+# ==========================================================
+# 🩹 PATCH Program (modification partielle)
+# ==========================================================
+@app.patch("/program/{program_id}", response_model=schemas.ProgramOut)
+async def patch_program(
+    program_id: int, payload: schemas.ProgramPatch, db: Session = Depends(get_db)
+):
+    """Modifie le titre, les notes ou certains jours sans tout réanalyser."""
+    program = db.get(models.Program, program_id)
+    if not program:
+        raise HTTPException(404, "Programme introuvable")
+
+    if program.status == "pending":
+        raise HTTPException(409, "Programme en cours d'analyse")
+
+    if payload.days:
+        try:
+            days, delta = await patch_program_days(
+                await program_store.program_days(db, program), payload.days
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+        # Surcharge propre au client : seuls les jours modifiés créent des blocs
+        program_store.set_program_days(db, program, days)
+        program.calories = round((program.calories or 0.0) + delta, 2)
+
+    if payload.title is not None:
+        program.title = payload.title
+    if payload.notes is not None:
+        program.notes = payload.notes
+
+    db.commit()
+    db.refresh(program)
+
+    return await render_program(db, program)
 
 
 # ==========================================================
@@ -0,0 +1,180 @@
+# app/meal_engine.py
+import os
+import asyncio
+
+# -----------------------------------------------------------
+# ⚙️ Réglages du fan-out (surchargeables via .env)
+# -----------------------------------------------------------
+MEAL_AI_CONCURRENCY = int(os.getenv("MEAL_AI_CONCURRENCY", "8"))
+MEAL_AI_TIMEOUT = float(os.getenv("MEAL_AI_TIMEOUT", "20"))
+
+# Regroupement des repas non cachés en un seul prompt
+MEAL_BATCH_SIZE = int(os.getenv("MEAL_BATCH_SIZE", "30"))
+MEAL_BATCH_WINDOW = float(os.getenv("MEAL_BATCH_WINDOW", "0.02"))
+MEAL_BATCH_TIMEOUT = float(os.getenv("MEAL_BATCH_TIMEOUT", "45"))
+
+# Budget total d'analyse d'un programme : lots (ingrédients puis repas) et
+# appels unitaires se partagent ce délai, chaque étape reçoit le restant
+MEAL_AI_DEADLINE = float(os.getenv("MEAL_AI_DEADLINE", "45"))
+
+
+def meal_key(meal_text: str) -> str:
+    """Clé de déduplication d'un repas (même normalisation que le cache)."""
+    return meal_text.lower().strip()
+
+
+async def resolve_meals(
+    meal_texts,
+    analyze,
+    fallback,
+    analyze_batch=None,
+    concurrency: int = MEAL_AI_CONCURRENCY,
+    timeout: float = MEAL_AI_TIMEOUT,
+    deadline: float = MEAL_AI_DEADLINE,
+) -> dict:
+    """
+    Analyse tous les repas d'un programme en parallèle.
+
+    - `analyze_batch(meal_texts, timeout)` : coroutine optionnelle qui résout
+      un lot de repas d'un coup (en `timeout` secondes au plus) et renvoie
+      {meal_key: details | None}
+    - `analyze(meal_text)` : coroutine qui renvoie un MealDetails (dict),
+      utilisée repas par repas pour ce que le lot n'a pas résolu
+    - `fallback(meal_text)` : estimation utilisée si l'appel dépasse `timeout`
+      ou si le budget total `deadline` est épuisé
+
+    Les repas identiques ne sont analysés qu'une fois, et au plus
+    `concurrency` analyses unitaires tournent simultanément. L'ensemble
+    (lot + appels unitaires) tient dans `deadline` secondes.
+    Retourne {meal_key: details}.
+    """
+    unique = {}
+    for text in meal_texts:
+        unique.setdefault(meal_key(text), text)
+
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+
+    def remaining() -> float:
+        return max(0.0, end - loop.time())
+
+    resolved = {}
+    if analyze_batch and unique:
+        found = await analyze_batch(list(unique.values()), remaining())
+        resolved = {k: v for k, v in found.items() if v is not None}
+
+    todo = {k: t for k, t in unique.items() if k not in resolved}
+    if not todo:
+        return resolved
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(key: str, text: str):
+        async with semaphore:
+            budget = min(timeout, remaining())
+            if budget <= 0:
+                print("⏱️ BUDGET IA ÉPUISÉ →", text)
+                return key, fallback(text)
+            try:
+                return key, await asyncio.wait_for(analyze(text), budget)
+            except asyncio.TimeoutError:
+                print("⏱️ TIMEOUT IA →", text)
+                return key, fallback(text)
+
+    results = await asyncio.gather(*(run(k, t) for k, t in todo.items()))
+    resolved.update(results)
+    return resolved
+
+
+# -----------------------------------------------------------
+# 📦 Regroupement des analyses IA (un prompt pour N repas)
+# -----------------------------------------------------------
+class MealBatcher:
+    """
+    Accumule les repas (ou aliments) à analyser pendant `window` secondes (ou jusqu'à
+    `max_batch` repas) puis les envoie dans un seul prompt structuré.
+    Les requêtes concurrentes (plusieurs programmes créés en même temps)
+    partagent donc le même appel IA.
+
+    - `ask_batch({"m0": texte, ...})` : coroutine → {"m0": brut, ...}
+    - `check(brut)` : valide/normalise une entrée, None si inutilisable
+    """
+
+    def __init__(
+        self,
+        ask_batch,
+        check,
+        max_batch: int = MEAL_BATCH_SIZE,
+        window: float = MEAL_BATCH_WINDOW,
+        timeout: float = MEAL_BATCH_TIMEOUT,
+    ):
+        self.ask_batch = ask_batch
+        self.check = check
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.timeout = timeout
+
+        self._pending = {}          # meal_key -> (texte, future)
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def analyze_many(self, meal_texts, timeout: float | None = None) -> dict:
+        """
+        Retourne {meal_key: details | None} pour chaque repas demandé.
+        Avec `timeout`, n'attend pas au-delà : les repas dont le lot n'est
+        pas revenu sont absents du résultat (l'envoi partagé continue pour
+        les autres appelants, les futures ne sont pas annulées).
+        """
+        if timeout is not None and timeout <= 0:
+            return {}
+
+        loop = asyncio.get_running_loop()
+        futures = {}
+
+        for text in meal_texts:
+            key = meal_key(text)
+            if key not in self._pending:
+                self._pending[key] = (text, loop.create_future())
+            futures[key] = self._pending[key][1]
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        if timeout is None:
+            results = await asyncio.gather(*futures.values())
+            return dict(zip(futures.keys(), results))
+
+        await asyncio.wait(set(futures.values()), timeout=timeout)
+        return {key: f.result() for key, f in futures.items() if f.done()}
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending = list(self._pending.items())
+        self._pending = {}
+
+        for start in range(0, len(pending), self.max_batch):
+            task = asyncio.create_task(self._send(pending[start:start + self.max_batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, chunk):
+        ids = {f"m{i}": item for i, item in enumerate(chunk)}
+        print(f"🧠 IA BATCH → {len(ids)} repas")
+
+        try:
+            raw = await asyncio.wait_for(
+                self.ask_batch({i: text for i, (_, (text, _)) in ids.items()}),
+                self.timeout,
+            )
+        except Exception as e:
+            print("🔴 ERREUR IA BATCH:", e)
+            raw = {}
+
+        for i, (_, (_, future)) in ids.items():
+            if not future.done():
+                future.set_result(self.check(raw.get(i)))
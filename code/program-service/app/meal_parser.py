@@ -0,0 +1,104 @@
+# app/meal_parser.py
+import re
+import unicodedata
+from typing import NamedTuple
+
+
+class Ingredient(NamedTuple):
+    text: str        # texte d'origine ("250g poulet")
+    food: str        # clé normalisée ("poulet")
+    quantity: float  # 250
+    unit: str        # "g" | "ml" | "unit"
+
+
+# -----------------------------------------------------------
+# 📏 Unités reconnues → (unité de base, facteur)
+# -----------------------------------------------------------
+UNITS = {
+    "g": ("g", 1), "gr": ("g", 1), "gramme": ("g", 1), "grammes": ("g", 1),
+    "kg": ("g", 1000),
+    "ml": ("ml", 1), "cl": ("ml", 10), "dl": ("ml", 100),
+    "l": ("ml", 1000), "litre": ("ml", 1000), "litres": ("ml", 1000),
+    "cas": ("ml", 15), "c. à soupe": ("ml", 15), "c.à.s": ("ml", 15),
+    "cuillère à soupe": ("ml", 15), "cuillères à soupe": ("ml", 15), "tbsp": ("ml", 15),
+    "cac": ("ml", 5), "c. à café": ("ml", 5), "c.à.c": ("ml", 5),
+    "cuillère à café": ("ml", 5), "cuillères à café": ("ml", 5), "tsp": ("ml", 5),
+    "tranche": ("unit", 1), "tranches": ("unit", 1),
+    "portion": ("unit", 1), "portions": ("unit", 1),
+    "pièce": ("unit", 1), "pièces": ("unit", 1), "piece": ("unit", 1), "pieces": ("unit", 1),
+    "unité": ("unit", 1), "unités": ("unit", 1), "x": ("unit", 1),
+}
+
+_QTY = r"\d+(?:[.,]\d+)?(?:/\d+)?|½|¼|¾"
+_UNIT = "|".join(re.escape(u) for u in sorted(UNITS, key=len, reverse=True))
+
+# "250g poulet", "250 g de riz", "2 c. à soupe d'huile", "1 avocat"
+_LEADING = re.compile(
+    rf"^(?P<qty>{_QTY})\s*(?:(?P<unit>{_UNIT})(?=\s|$))?\s*(?:de\s+|d'|d’|of\s+)?(?P<food>.+)$",
+    re.IGNORECASE,
+)
+# "poulet 250g", "avocat 1"
+_TRAILING = re.compile(
+    rf"^(?P<food>.+?)\s+(?P<qty>{_QTY})\s*(?P<unit>{_UNIT})?$",
+    re.IGNORECASE,
+)
+
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75}
+
+
+def _parse_quantity(raw: str) -> float:
+    if raw in _FRACTIONS:
+        return _FRACTIONS[raw]
+    raw = raw.replace(",", ".")
+    if "/" in raw:
+        num, den = raw.split("/", 1)
+        return float(num) / float(den) if float(den) else 0.0
+    return float(raw)
+
+
+def normalize_food(name: str) -> str:
+    """
+    Clé de cache d'un aliment : minuscules, sans accents ni ponctuation,
+    pluriels simples retirés ("Œufs" → "oeuf", "pâtes" → "pate").
+    """
+    name = name.lower().replace("œ", "oe").replace("’", "'")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r"[^a-z0-9 ]+", " ", name)
+
+    words = []
+    for word in name.split():
+        if len(word) > 3 and word[-1] in "sx" and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+
+def parse_item(text: str) -> Ingredient | None:
+    """Découpe un élément ("250g poulet") en (aliment, quantité, unité)."""
+    text = text.strip()
+    if not text:
+        return None
+
+    match = _LEADING.match(text) or _TRAILING.match(text)
+    if match:
+        quantity = _parse_quantity(match.group("qty"))
+        base, factor = UNITS.get((match.group("unit") or "").lower(), ("unit", 1))
+        food = match.group("food")
+    else:
+        # Pas de quantité explicite : une portion
+        quantity, base, factor, food = 1.0, "unit", 1, text
+
+    food = normalize_food(food)
+    if not food or quantity <= 0:
+        return None
+
+    return Ingredient(text, food, quantity * factor, base)
+
+
+def parse_meal(meal_text: str) -> list:
+    """Découpe un repas libre en liste d'Ingredient (éléments vides ignorés)."""
+    # virgule décimale ("1,5 kg") conservée
+    parts = re.split(r"[\n;+]+|(?<!\d),|,(?!\d)", meal_text)
+    items = [parse_item(part) for part in parts]
+    return [i for i in items if i]
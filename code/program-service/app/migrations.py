@@ -0,0 +1,22 @@
+# app/migrations.py
+from sqlalchemy import text
+
+# -----------------------------------------------------------
+# 🧱 Évolutions de schéma idempotentes
+# (create_all ne modifie pas les tables déjà existantes)
+# -----------------------------------------------------------
+MIGRATIONS = [
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS status VARCHAR NOT NULL DEFAULT 'ready'",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS source_days JSONB",
+    "ALTER TABLE programs ALTER COLUMN days DROP NOT NULL",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS day_refs JSONB",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS template_id INTEGER REFERENCES program_templates(id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_template_id ON programs (template_id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_coach_client ON programs (coach_id, client_id)",
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
@@ -1,9 +1,41 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
 from .db import Base
 
 
+class ProgramBlock(Base):
+    """
+    Bloc de contenu adressé par hash (sha256 du JSON canonique) :
+    - kind "meal" : MealDetails
+    - kind "day"  : jour dont les repas pointent vers des blocs "meal"
+    Immuable : un même jour / repas analysé est partagé par tous les programmes.
+    """
+    __tablename__ = "program_blocks"
+
+    hash = Column(String(64), primary_key=True)
+    kind = Column(String(10), nullable=False)
+    content = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProgramTemplate(Base):
+    """Programme type d'un coach, réutilisable pour plusieurs clients."""
+    __tablename__ = "program_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    coach_id = Column(Integer, nullable=False, index=True)
+
+    title = Column(String, nullable=False)
+    notes = Column(Text, nullable=True)
+
+    day_refs = Column(JSONB, nullable=False)
+    calories = Column(Float, default=0.0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Program(Base):
     __tablename__ = "programs"
 
@@ -14,8 +46,38 @@ class Program(Base):
     title = Column(String, nullable=False)
     notes = Column(Text, nullable=True)
 
-    # JSONB robuste pour repas + exercices + sets
-    days = Column(JSONB, nullable=False)
+    # Ancien stockage : copie complète des jours (programmes historiques).
+    # Les nouveaux programmes laissent NULL et utilisent day_refs.
+    days = Column(JSONB(none_as_null=True), nullable=True)
+
+    # Jours partagés : liste de hash de blocs "day" (program_blocks).
+    # NULL + template_id → jours du modèle (aucune surcharge client)
+    day_refs = Column(JSONB(none_as_null=True), nullable=True)
+    template_id = Column(Integer, ForeignKey("program_templates.id"), nullable=True, index=True)
 
     # total calories de la semaine
     calories = Column(Float, default=0.0)
+
+    # "pending" (analyse IA en file d'attente) | "ready" | "failed"
+    status = Column(String, nullable=False, default="ready", server_default="ready")
+
+    # jours bruts reçus (ProgramCreateDay) tant que l'analyse n'est pas faite
+    source_days = Column(JSONB, nullable=True)
+
+    __table_args__ = (
+        # Liste coach (filtre client) sans parcourir toute la table
+        Index("ix_programs_coach_client", "coach_id", "client_id"),
+    )
+
+
+class ExerciseVideo(Base):
+    """Index persistant exercice → vidéo YouTube (clé = nom normalisé)."""
+    __tablename__ = "exercise_videos"
+
+    key = Column(String, primary_key=True)          # "developpe couche"
+    exercise_name = Column(String, nullable=False)  # "Développé couché"
+
+    # None = aucune vidéo trouvée (retentée après VIDEO_RETRY_DAYS)
+    video_url = Column(String, nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
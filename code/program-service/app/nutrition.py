@@ -0,0 +1,271 @@
+# app/nutrition.py
+import asyncio
+import copy
+import json
+import re
+
+from .cache import TwoTierCache
+from .meal_engine import resolve_meals, meal_key, MealBatcher
+from .ai_client import ask_nutrition_batch, check_meal_details, chat_completion
+from .ingredients import meals_from_ingredients, local_meal
+
+# Repas attendus par le schéma Meals
+REQUIRED_MEALS = {"breakfast", "lunch", "dinner"}
+
+
+# ==========================================================
+# 🧠 IA Calories avec Redis Cache
+# ==========================================================
+def fallback_meal_calories(meal_text: str) -> dict:
+    """Estimation par défaut (120 kcal / aliment) quand l'IA échoue."""
+    items = [i.strip() for i in re.split(r"[,\n;]+", meal_text) if i.strip()]
+    return {
+        "foods": [{"name": item, "calories": 120.0} for item in items],
+        "meal_calories": float(120 * len(items))
+    }
+
+
+meal_cache = TwoTierCache("meal_cache", ttl=60 * 60 * 24, negative_ttl=60)
+
+
+async def get_meal_calories_ai(meal_text: str) -> dict:
+    """
+    Analyse d'un repas : table locale, puis cache (mémoire → Redis), puis IA.
+    L'appel IA passe par la couche HTTP async partagée (pool, retries,
+    coupe-circuit) ; un seul appel IA par repas à la fois.
+    """
+    local = local_meal(meal_text)
+    if local:
+        return local
+
+    data = await meal_cache.get_or_load(
+        meal_key(meal_text), lambda: _ask_meal_ai(meal_text)
+    )
+    return data or fallback_meal_calories(meal_text)
+
+
+async def _ask_meal_ai(meal_text: str) -> dict | None:
+
+    print("🧠 IA HIT →", meal_text)
+
+    prompt = f"""
+Analyse précisément les calories pour chaque aliment dans:
+
+"{meal_text}"
+
+Retourne STRICTEMENT un JSON comme ceci:
+
+{{
+  "foods": [
+    {{"name": "250g poulet", "calories": 415}}
+  ],
+  "meal_calories": 415
+}}
+
+Règles :
+- calories selon portion
+- rien hors JSON
+"""
+
+    try:
+        raw = await chat_completion([{"role": "user", "content": prompt}], temperature=0)
+
+        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
+        if not json_match:
+            raise ValueError("Réponse IA non JSON")
+
+        data = check_meal_details(json.loads(json_match.group(0)))
+        if not data:
+            raise ValueError("JSON IA invalide")
+
+        return data
+
+    except Exception as e:
+        print("🔴 ERREUR IA:", e)
+        return None  # cache négatif, puis estimation par défaut
+
+
+# ==========================================================
+# 📦 IA Calories groupée (un prompt pour tous les repas non cachés)
+# ==========================================================
+meal_batcher = MealBatcher(ask_nutrition_batch, check_meal_details)
+
+
+async def get_meals_calories_batch(meal_texts: list, timeout: float | None = None) -> dict:
+    """
+    Résout d'abord les repas avec la table locale d'aliments (sans réseau),
+    lit le cache (mémoire, puis Redis en un seul MGET), assemble les repas
+    manquants depuis le cache par ingrédient, puis envoie ceux qui restent
+    au MealBatcher.
+    Les deux étapes IA (ingrédients puis repas) partagent le même budget
+    `timeout` : la seconde ne reçoit que le temps restant.
+    Retourne {meal_key: details | None} ; les None sont ensuite repris un
+    par un par get_meal_calories_ai.
+    """
+    loop = asyncio.get_running_loop()
+    end = None if timeout is None else loop.time() + timeout
+
+    def remaining():
+        return None if end is None else max(0.0, end - loop.time())
+
+    results = {}
+    pending = []
+    for text in meal_texts:
+        local = local_meal(text)
+        if local:
+            results[meal_key(text)] = local
+        else:
+            pending.append(text)
+
+    if not pending:
+        print(f"🥗 LOCAL HIT → {len(meal_texts)}/{len(meal_texts)} repas")
+        return results
+
+    cached = await meal_cache.get_many([meal_key(t) for t in pending])
+    results.update(cached)
+    misses = [t for t in pending if meal_key(t) not in cached]
+
+    if misses:
+        found = await meals_from_ingredients(misses, remaining())
+
+        unresolved = [t for t in misses if not found.get(meal_key(t))]
+        if unresolved:
+            found.update(await meal_batcher.analyze_many(unresolved, remaining()))
+
+        await meal_cache.set_many({k: v for k, v in found.items() if v})
+        results.update(found)
+
+    print(f"⚡ CACHE HIT → {len(pending) - len(misses)}/{len(pending)} repas")
+    return results
+
+
+# ==========================================================
+# 🛠️ Meal Details
+# ==========================================================
+def compute_meal_details(meals: dict, resolved: dict):
+    """Assemble les détails d'une journée à partir des repas déjà analysés."""
+    details = {}
+    day_total = 0.0
+
+    for meal_name, meal_text in meals.items():
+        result = resolved[meal_key(meal_text)]
+        details[meal_name] = result
+        day_total += result["meal_calories"]
+
+    return details, round(day_total, 2)
+
+
+def stored_meal_details(stored_days: list) -> dict:
+    """
+    {meal_key: MealDetails} des repas déjà analysés d'un programme, à partir
+    du texte d'origine conservé dans chaque jour ("meal_texts").
+    """
+    reuse = {}
+    for day in stored_days or []:
+        for meal_name, meal_text in (day.get("meal_texts") or {}).items():
+            details = (day.get("meals") or {}).get(meal_name)
+            if details:
+                reuse.setdefault(meal_key(meal_text), details)
+    return reuse
+
+
+async def resolve_program_meals(meal_texts: list, previous_days: list | None = None) -> dict:
+    """
+    Analyse des repas en une seule vague concurrente, en réutilisant les
+    MealDetails déjà stockés pour les textes inchangés.
+    """
+    resolved = stored_meal_details(previous_days)
+    todo = [t for t in meal_texts if meal_key(t) not in resolved]
+
+    if todo:
+        resolved.update(await resolve_meals(
+            todo,
+            analyze=get_meal_calories_ai,
+            fallback=fallback_meal_calories,
+            analyze_batch=get_meals_calories_batch,
+        ))
+
+    print(f"♻️ Repas réutilisés → {len(meal_texts) - len(todo)}/{len(meal_texts)}")
+    return resolved
+
+
+async def compute_program_days(days, previous_days: list | None = None):
+    """
+    Analyse tous les repas du programme en une seule vague concurrente,
+    puis reconstruit les jours. Retourne (out_days, total_semaine).
+    `previous_days` : jours stockés, dont les repas inchangés sont repris
+    sans nouvelle analyse.
+    """
+    resolved = await resolve_program_meals(
+        [text for day in days for text in day.meals.values()], previous_days
+    )
+    return build_program_days(days, resolved)
+
+
+def build_program_days(days, resolved: dict):
+    """Reconstruit les jours à partir des repas déjà analysés ({meal_key: details})."""
+    week_total = 0
+    out_days = []
+
+    for day in days:
+        meal_details, kcal = compute_meal_details(day.meals, resolved)
+        exercises = getattr(day, "exercises", []) or []
+
+        out_days.append({
+            "day": day.day,
+            "meals": meal_details,
+            "workout": day.workout or "Repos",
+            "daily_calories": kcal,
+            "exercises": [ex.dict() for ex in exercises],
+            "meal_texts": dict(day.meals),
+        })
+
+        week_total += kcal
+
+    return out_days, round(week_total, 2)
+
+
+async def patch_program_days(stored_days: list, patch_days: list):
+    """
+    Applique des modifications partielles (ProgramPatchDay) aux jours stockés.
+    Seuls les repas envoyés sont analysés ; les totaux sont mis à jour par
+    différence. Retourne (jours, variation_calories_semaine).
+    """
+    days = copy.deepcopy(stored_days or [])
+    by_name = {day["day"]: day for day in days}
+
+    resolved = await resolve_program_meals(
+        [text for p in patch_days for text in (p.meals or {}).values()], stored_days
+    )
+
+    delta = 0.0
+    for patch in patch_days:
+        day = by_name.get(patch.day)
+        if day is None:
+            missing = REQUIRED_MEALS - set(patch.meals or {})
+            if missing:
+                raise ValueError(f"Nouveau jour '{patch.day}' : repas manquants {sorted(missing)}")
+            day = {"day": patch.day, "meals": {}, "workout": "Repos",
+                   "daily_calories": 0.0, "exercises": [], "meal_texts": {}}
+            days.append(day)
+            by_name[patch.day] = day
+
+        previous_kcal = day.get("daily_calories") or 0.0
+
+        if patch.meals:
+            details, _ = compute_meal_details(patch.meals, resolved)
+            day["meals"] = {**day.get("meals", {}), **details}
+            day["meal_texts"] = {**(day.get("meal_texts") or {}), **patch.meals}
+            day["daily_calories"] = round(
+                sum(m["meal_calories"] for m in day["meals"].values()), 2
+            )
+
+        if patch.workout is not None:
+            day["workout"] = patch.workout or "Repos"
+
+        if patch.exercises is not None:
+            day["exercises"] = [ex.dict() for ex in patch.exercises]
+
+        delta += day["daily_calories"] - previous_kcal
+
+    return days, round(delta, 2)
@@ -0,0 +1,208 @@
+# app/program_store.py
+import json
+import hashlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+from .auth_client import user_emails
+from .cache import TwoTierCache
+
+# Les blocs sont immuables (adressés par leur contenu) : cache long
+block_cache = TwoTierCache("program_block", ttl=60 * 60 * 24 * 7)
+
+
+def block_hash(content) -> str:
+    """sha256 du JSON canonique (clés triées, sans espaces)."""
+    raw = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ==========================================================
+# ✂️ Jours complets → blocs
+# ==========================================================
+def split_days(days: list):
+    """
+    Découpe des jours complets en blocs "day" et "meal".
+    Retourne (day_refs, {hash: (kind, content)}).
+    """
+    blocks = {}
+    day_refs = []
+
+    for day in days:
+        meal_refs = {}
+        for meal_name, details in (day.get("meals") or {}).items():
+            h = block_hash(details)
+            blocks[h] = ("meal", details)
+            meal_refs[meal_name] = h
+
+        content = {**day, "meals": meal_refs}
+        h = block_hash(content)
+        blocks[h] = ("day", content)
+        day_refs.append(h)
+
+    return day_refs, blocks
+
+
+def save_blocks(db: Session, blocks: dict):
+    """Insère les blocs absents en une requête (sans commit)."""
+    if not blocks:
+        return
+
+    stmt = insert(models.ProgramBlock).values([
+        {"hash": h, "kind": kind, "content": content}
+        for h, (kind, content) in blocks.items()
+    ])
+    db.execute(stmt.on_conflict_do_nothing(index_elements=[models.ProgramBlock.hash]))
+
+
+def store_days(db: Session, days: list) -> list:
+    """Enregistre les blocs de `days` et retourne la liste des refs de jours."""
+    day_refs, blocks = split_days(days)
+    save_blocks(db, blocks)
+    return day_refs
+
+
+# ==========================================================
+# 🧩 Blocs → jours complets
+# ==========================================================
+async def load_blocks(db: Session, hashes) -> dict:
+    """{hash: contenu} via le cache (mémoire → Redis), puis Postgres."""
+    hashes = list(dict.fromkeys(hashes))
+    if not hashes:
+        return {}
+
+    found = {h: c for h, c in (await block_cache.get_many(hashes)).items() if c is not None}
+    missing = [h for h in hashes if h not in found]
+
+    if missing:
+        rows = db.execute(
+            select(models.ProgramBlock.hash, models.ProgramBlock.content)
+            .where(models.ProgramBlock.hash.in_(missing))
+        ).all()
+        loaded = {h: content for h, content in rows}
+        await block_cache.set_many(loaded)
+        found.update(loaded)
+
+    return found
+
+
+async def assemble_days(db: Session, refs_list: list) -> list:
+    """
+    Reconstruit plusieurs listes de jours d'un coup
+    (2 lectures de blocs au plus : jours puis repas).
+    """
+    day_blocks = await load_blocks(db, [h for refs in refs_list for h in refs])
+    meal_blocks = await load_blocks(db, [
+        h for day in day_blocks.values() for h in (day.get("meals") or {}).values()
+    ])
+
+    out = []
+    for refs in refs_list:
+        days = []
+        for h in refs:
+            day = day_blocks.get(h)
+            if day is None:
+                continue
+            meals = {name: meal_blocks[mh] for name, mh in day["meals"].items() if mh in meal_blocks}
+            days.append({**day, "meals": meals})
+        out.append(days)
+    return out
+
+
+def _refs_for(program, templates: dict) -> list | None:
+    if program.day_refs is not None:
+        return program.day_refs
+    if program.template_id is not None:
+        template = templates.get(program.template_id)
+        return template.day_refs if template else []
+    return None
+
+
+async def programs_days(db: Session, programs: list) -> list:
+    """Jours complets de chaque programme (anciens : colonne `days`)."""
+    template_ids = {
+        p.template_id for p in programs
+        if p.day_refs is None and p.template_id is not None
+    }
+    templates = {
+        t.id: t for t in db.scalars(
+            select(models.ProgramTemplate).where(models.ProgramTemplate.id.in_(template_ids))
+        )
+    } if template_ids else {}
+
+    refs = [_refs_for(p, templates) for p in programs]
+    assembled = iter(await assemble_days(db, [r for r in refs if r is not None]))
+
+    return [
+        (p.days or []) if r is None else next(assembled)
+        for p, r in zip(programs, refs)
+    ]
+
+
+async def program_days(db: Session, program) -> list:
+    return (await programs_days(db, [program]))[0]
+
+
+def program_out(program, days: list, coach_email: str | None = None) -> dict:
+    """Forme ProgramOut d'un programme et de ses jours reconstitués."""
+    return {
+        "id": program.id,
+        "coach_id": program.coach_id,
+        "client_id": program.client_id,
+        "title": program.title,
+        "notes": program.notes,
+        "days": days,
+        "calories": program.calories or 0.0,
+        "status": program.status,
+        "coach_email": coach_email,
+    }
+
+
+async def render_programs(db: Session, programs: list) -> list:
+    """ProgramOut de plusieurs programmes (emails des coachs en un appel auth-service)."""
+    days = await programs_days(db, programs)
+    emails = await user_emails(p.coach_id for p in programs)
+    return [program_out(p, d, emails.get(p.coach_id)) for p, d in zip(programs, days)]
+
+
+async def render_program(db: Session, program) -> dict:
+    return (await render_programs(db, [program]))[0]
+
+
+def set_program_days(db: Session, program, days: list):
+    """Remplace les jours d'un programme par des références de blocs."""
+    program.day_refs = store_days(db, days)
+    program.days = None
+
+
+# ==========================================================
+# 🧹 Conversion des anciens programmes (colonne days → blocs)
+# ==========================================================
+def compact_legacy_programs(db: Session, batch_size: int = 200) -> int:
+    """Convertit les programmes stockés en copie complète. Retourne le nombre traité."""
+    total = 0
+    while True:
+        programs = db.scalars(
+            select(models.Program).where(models.Program.days.isnot(None)).limit(batch_size)
+        ).all()
+        if not programs:
+            return total
+
+        for program in programs:
+            set_program_days(db, program, program.days)
+        db.commit()
+        total += len(programs)
+
+
+if __name__ == "__main__":
+    # python -m app.program_store → conversion des programmes historiques
+    from .db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print("🧹 Programmes convertis en blocs →", compact_legacy_programs(db))
+    finally:
+        db.close()
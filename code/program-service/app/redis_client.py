@@ -1,9 +1,24 @@
 # app/redis_client.py
+import os
 import redis
 
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
-    db=0,
+# -----------------------------------------------------------
+# 🔌 Connexion Redis (pool partagé, surchargeable via .env)
+# -----------------------------------------------------------
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+    socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "1")),
+    socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "1")),
+    health_check_interval=30,
+    retry_on_timeout=True,
     decode_responses=True  # pour recevoir les strings en clair
 )
+
+redis_client = redis.Redis(connection_pool=pool)
+
+# Client dédié aux commandes bloquantes (BRPOP de la file de jobs) :
+# pas de socket_timeout, sinon l'attente serait coupée
+blocking_redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
@@ -60,6 +60,77 @@ class ProgramCreate(BaseModel):
     days: List[ProgramCreateDay]
 
 
+# -------------------------
+# Program bulk (un modèle → N clients)
+# -------------------------
+class ProgramBulkTemplate(BaseModel):
+    coach_id: int
+    title: str
+    notes: Optional[str] = None
+    days: List[ProgramCreateDay]
+
+
+class ProgramBulkCreate(BaseModel):
+    template: Optional[ProgramBulkTemplate] = None
+    client_ids: List[int] = []          # un programme par client à partir du modèle
+    programs: List[ProgramCreate] = []  # et/ou des programmes complets
+
+
+class ProgramBulkItem(BaseModel):
+    index: int
+    client_id: int
+    status: str                         # "created" | "error"
+    program_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ProgramBulkResult(BaseModel):
+    created: int
+    errors: int
+    items: List[ProgramBulkItem]
+
+
+# -------------------------
+# Program templates (jours partagés entre clients)
+# -------------------------
+class ProgramTemplateCreate(BaseModel):
+    coach_id: int
+    title: str
+    notes: Optional[str] = None
+    days: List[ProgramCreateDay]
+
+
+class ProgramTemplateOut(BaseModel):
+    id: int
+    coach_id: int
+    title: str
+    notes: Optional[str]
+    days: List[ProgramDay]
+    calories: float
+
+
+class ProgramTemplateAssign(BaseModel):
+    client_ids: List[int]
+    title: Optional[str] = None     # sinon titre du modèle
+    notes: Optional[str] = None
+
+
+# -------------------------
+# Program patch (modification partielle)
+# -------------------------
+class ProgramPatchDay(BaseModel):
+    day: str
+    meals: Optional[Dict[str, str]] = None       # seuls ces repas sont remplacés
+    workout: Optional[str] = None
+    exercises: Optional[List[Exercise]] = None
+
+
+class ProgramPatch(BaseModel):
+    title: Optional[str] = None
+    notes: Optional[str] = None
+    days: List[ProgramPatchDay] = []
+
+
 # -------------------------
 # Program output
 # -------------------------
@@ -71,9 +142,32 @@ class ProgramOut(BaseModel):
     notes: Optional[str]
     days: List[ProgramDay]
     calories: float
+    status: str = "ready"
 
     # pratique pour l’UI
     coach_email: Optional[str] = None
 
     class Config:
         from_attributes = True   # Pydantic V1 + V2
+
+
+class ProgramStatus(BaseModel):
+    id: int
+    status: str
+
+    class Config:
+        from_attributes = True
+
+
+# -------------------------
+# Program summary (listes, sans les jours)
+# -------------------------
+class ProgramSummary(BaseModel):
+    id: int
+    client_id: int
+    title: str
+    calories: float
+    status: str
+
+    class Config:
+        from_attributes = True
@@ -1,26 +1,11 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from fitnessbro_auth import TokenVerifier
 
 JWT_SECRET = "change-me"   # même clé que dans auth-service/security.py
 JWT_ALG = "HS256"
-security = HTTPBearer()
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """
-    Vérifie et décode le token JWT.
-    Retourne l'ID et le rôle de l'utilisateur.
-    """
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        user_id = int(payload.get("sub"))
-        role = payload.get("role")
+# Vérification partagée (shared/fitnessbro_auth) : les claims déjà
+# vérifiés sont mis en cache, un même jeton n'est décodé qu'une fois.
+verifier = TokenVerifier(JWT_SECRET, JWT_ALG)
 
-        if user_id is None or role is None:
-            raise HTTPException(status_code=401, detail="Token incomplet ou invalide")
-
-        return {"user_id": user_id, "role": role}
-
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token invalide ou expiré")
+# Dépendance FastAPI → {"user_id": int, "role": str}
+verify_token = verifier.dependency
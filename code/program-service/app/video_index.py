@@ -0,0 +1,192 @@
+# app/video_index.py
+import os
+import re
+import asyncio
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+from .cache import TwoTierCache
+from . import http_client
+
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+# Surchargeable pour tester contre un serveur local
+YOUTUBE_API_URL = os.getenv("YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3")
+
+# Une recherche sans résultat est retentée après ce délai
+VIDEO_RETRY_DAYS = int(os.getenv("VIDEO_RETRY_DAYS", "30"))
+PREWARM_CONCURRENCY = int(os.getenv("VIDEO_PREWARM_CONCURRENCY", "4"))
+
+video_cache = TwoTierCache("video_cache", ttl=60 * 60 * 24 * 7, negative_ttl=60 * 60)
+
+
+def normalize_exercise(name: str) -> str:
+    """Clé d'index : "Développé  Couché" → "developpe couche"."""
+    name = unicodedata.normalize("NFKD", name.lower())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+# ==========================================================
+# ▶️ YouTube API – Recherche vidéo exercice
+# ==========================================================
+async def search_exercise_video(exercise_name: str) -> str | None:
+    """
+    Recherche la meilleure vidéo YouTube pour un exercice (démonstration).
+    Retourne l’URL complète, "" si aucune vidéo, None en cas d'erreur.
+    """
+
+    query = f"{exercise_name} exercise proper form"
+
+    url = f"{YOUTUBE_API_URL}/search"
+
+    params = {
+        "part": "snippet",
+        "q": query,
+        "key": YOUTUBE_API_KEY,
+        "maxResults": 1,
+        "type": "video",
+        "videoDuration": "short"
+    }
+
+    try:
+        data = await http_client.get_json(url, params=params, deadline=10)
+
+        if "items" in data and len(data["items"]) > 0:
+            video_id = data["items"][0]["id"]["videoId"]
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+        return ""
+
+    except Exception as e:
+        print("🔴 ERREUR YOUTUBE:", e)
+        return None
+
+
+# ==========================================================
+# 🗂️ Index persistant exercice → vidéo
+# ==========================================================
+def save_videos(db: Session, entries: dict):
+    """Upsert {key: (nom exercice, url | None)} en une seule requête."""
+    if not entries:
+        return
+
+    stmt = insert(models.ExerciseVideo).values([
+        {"key": key, "exercise_name": name, "video_url": url}
+        for key, (name, url) in entries.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.ExerciseVideo.key],
+        set_={
+            "exercise_name": stmt.excluded.exercise_name,
+            "video_url": stmt.excluded.video_url,
+            "updated_at": text("now()"),
+        },
+    ))
+    db.commit()
+
+
+def _is_stale(row: models.ExerciseVideo) -> bool:
+    if row.video_url or row.updated_at is None:
+        return False
+    return row.updated_at < datetime.now(timezone.utc) - timedelta(days=VIDEO_RETRY_DAYS)
+
+
+async def get_exercise_video_url(db: Session, exercise_name: str) -> str | None:
+    """
+    Cache (mémoire → Redis) → index Postgres → recherche YouTube.
+    Une recherche n'est faite que pour un exercice jamais indexé
+    (ou sans vidéo depuis VIDEO_RETRY_DAYS jours).
+    """
+    key = normalize_exercise(exercise_name)
+    if not key:
+        return None
+
+    async def load():
+        row = db.get(models.ExerciseVideo, key)
+        if row and not _is_stale(row):
+            return row.video_url
+
+        url = await search_exercise_video(exercise_name)
+        if url is None:
+            return None  # erreur : cache négatif court, rien en base
+
+        save_videos(db, {key: (exercise_name, url or None)})
+        return url or None
+
+    return await video_cache.get_or_load(key, load)
+
+
+def program_exercise_names(db: Session) -> list:
+    """
+    Noms d'exercices distincts présents dans tous les programmes
+    (anciens programmes en copie complète + blocs "day" partagés).
+    """
+    return db.execute(text("""
+        SELECT ex->>'name'
+        FROM programs,
+             jsonb_array_elements(days) AS d,
+             jsonb_array_elements(d->'exercises') AS ex
+        WHERE days IS NOT NULL AND ex->>'name' IS NOT NULL
+        UNION
+        SELECT ex->>'name'
+        FROM program_blocks AS b,
+             jsonb_array_elements(b.content->'exercises') AS ex
+        WHERE b.kind = 'day' AND ex->>'name' IS NOT NULL
+    """)).scalars().all()
+
+
+async def prewarm_videos(db: Session) -> dict:
+    """
+    Indexe en masse tous les exercices des programmes qui ne sont pas encore
+    dans `exercise_videos` (recherches YouTube limitées à
+    PREWARM_CONCURRENCY en parallèle), puis remplit le cache.
+    """
+    by_key = {}
+    for name in program_exercise_names(db):
+        key = normalize_exercise(name)
+        if key:
+            by_key.setdefault(key, name)
+
+    existing = set(db.scalars(
+        select(models.ExerciseVideo.key).where(models.ExerciseVideo.key.in_(list(by_key)))
+    )) if by_key else set()
+
+    todo = {k: n for k, n in by_key.items() if k not in existing}
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def search(key: str, name: str):
+        async with semaphore:
+            return key, await search_exercise_video(name)
+
+    results = await asyncio.gather(*(search(k, n) for k, n in todo.items()))
+    found = {k: url or None for k, url in results if url is not None}
+
+    save_videos(db, {k: (todo[k], url) for k, url in found.items()})
+    await video_cache.set_many(found)
+
+    return {
+        "exercises": len(by_key),
+        "already_indexed": len(existing),
+        "indexed": sum(1 for url in found.values() if url),
+        "not_found": sum(1 for url in found.values() if not url),
+        "errors": len(todo) - len(found),
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.video_index → pré-chauffage hors requête HTTP
+    from .db import SessionLocal
+
+    async def main():
+        db = SessionLocal()
+        try:
+            print("🎬 Pré-chauffage vidéos →", await prewarm_videos(db))
+        finally:
+            db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# bench_auth.py — microbenchmark : décodage JWT complet vs cache, et
+# coût de la dépendance FastAPI (sync → threadpool vs async)
+#   python bench_auth.py [itérations]
+import sys
+import time
+import timeit
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from fitnessbro_auth import TokenVerifier
+
+SECRET = "bench-secret"
+
+
+def build_app(verifier: TokenVerifier) -> FastAPI:
+    """Deux routes identiques : dépendance async (celle du verifier) et sync."""
+
+    def sync_dependency(credentials: HTTPAuthorizationCredentials = Depends(verifier.scheme)):
+        return verifier.verify(credentials.credentials)
+
+    app = FastAPI()
+
+    @app.get("/async")
+    async def with_async(user=Depends(verifier.dependency)):
+        return user
+
+    @app.get("/sync")
+    async def with_sync(user=Depends(sync_dependency)):
+        return user
+
+    return app
+
+
+async def per_request(app: FastAPI, path: str, token: str, number: int) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):    # échauffement
+            await client.get(path, headers=headers)
+        start = time.perf_counter()
+        for _ in range(number):
+            await client.get(path, headers=headers)
+        return (time.perf_counter() - start) / number
+
+
+def main(number: int = 20000):
+    token = jwt.encode(
+        {"sub": "42", "role": "client", "exp": int(time.time()) + 3600}, SECRET, algorithm="HS256"
+    )
+    verifier = TokenVerifier(SECRET)
+    verifier.verify(token)  # premier passage : remplit le cache
+
+    full = timeit.timeit(lambda: verifier.decode(token), number=number) / number
+    cached = timeit.timeit(lambda: verifier.verify(token), number=number) / number
+
+    print(f"jose.jwt.decode complet : {full * 1e6:8.2f} µs / requête")
+    print(f"cache (sha256 + LRU)    : {cached * 1e6:8.2f} µs / requête")
+    print(f"gain                    : x{full / cached:.1f} ({(full - cached) * 1e6:.2f} µs économisées)")
+
+    # Requête HTTP complète (ASGI en process), jeton en cache
+    app = build_app(verifier)
+    requests = max(1, number // 10)
+    via_async = asyncio.run(per_request(app, "/async", token, requests))
+    via_sync = asyncio.run(per_request(app, "/sync", token, requests))
+
+    print(f"requête, dépendance async : {via_async * 1e6:8.2f} µs")
+    print(f"requête, dépendance sync  : {via_sync * 1e6:8.2f} µs (passage par le threadpool)")
+    print(f"écart                     : {(via_sync - via_async) * 1e6:8.2f} µs / requête")
+    print("cache :", verifier.cache.stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
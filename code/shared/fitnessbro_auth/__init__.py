@@ -0,0 +1,4 @@
+# fitnessbro_auth/__init__.py
+from .verifier import TokenVerifier, TokenCache
+
+__all__ = ["TokenVerifier", "TokenCache"]
@@ -0,0 +1,141 @@
+# fitnessbro_auth/verifier.py
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+
+# -----------------------------------------------------------
+# ⚙️ Réglages du cache (surchargeables via .env)
+# -----------------------------------------------------------
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Durée max d'une entrée (jeton sans "exp", révocation côté auth…)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+
+class TokenCache:
+    """
+    LRU borné des claims déjà vérifiés, clé = sha256 du jeton (le jeton
+    brut n'est pas conservé). Une entrée expire au plus tôt entre le
+    "exp" du jeton et `ttl` secondes.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # digest -> (expire_at wall clock, claims)
+        self._lock = threading.Lock()   # verify() peut aussi être appelé depuis des threads
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: bytes, claims: dict, exp: float | None):
+        expire_at = time.time() + self.ttl
+        if exp is not None:
+            expire_at = min(expire_at, exp)
+        with self._lock:
+            self._entries[key] = (expire_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TokenVerifier:
+    """
+    Vérification des JWT commune aux services.
+
+        verifier = TokenVerifier(JWT_SECRET, "HS256")
+        verify_token = verifier.dependency      # Depends(verify_token)
+
+    Retourne {"user_id": int, "role": str}. Le décodage complet (signature,
+    expiration) n'a lieu qu'au premier passage d'un jeton ; ensuite les
+    claims viennent du cache.
+    """
+
+    def __init__(
+        self,
+        secret: str,
+        algorithm: str = "HS256",
+        require_role: bool = True,
+        cache: TokenCache | None = None,
+    ):
+        self.secret = secret
+        self.algorithms = [algorithm]
+        self.require_role = require_role
+        self.cache = cache if cache is not None else TokenCache()
+        self.scheme = HTTPBearer()
+
+        # async : un passage par le cache est du pur CPU (quelques µs), un
+        # décodage complet reste court ; en sync, FastAPI ferait passer
+        # chaque requête authentifiée par le threadpool.
+        async def dependency(credentials: HTTPAuthorizationCredentials = Depends(self.scheme)):
+            return self.verify(credentials.credentials)
+
+        self.dependency = dependency
+
+    def decode(self, token: str) -> tuple:
+        """Vérification complète → (claims, exp | None). Lève HTTPException 401."""
+        try:
+            payload = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide ou expiré"
+            )
+
+        sub = payload.get("sub")
+        role = payload.get("role")
+        if sub is None or (self.require_role and role is None):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token incomplet ou invalide"
+            )
+
+        try:
+            claims = {"user_id": int(sub), "role": role}
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token incomplet ou invalide"
+            )
+
+        exp = payload.get("exp")
+        return claims, float(exp) if exp is not None else None
+
+    def verify(self, token: str) -> dict:
+        key = self.cache.key(token)
+        claims = self.cache.get(key)
+        if claims is None:
+            claims, exp = self.decode(token)
+            self.cache.set(key, claims, exp)
+        # copie : un appelant qui modifie le dict ne pollue pas le cache
+        return dict(claims)
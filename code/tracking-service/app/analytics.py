@@ -0,0 +1,175 @@
+# app/analytics.py
+import os
+from datetime import date
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .cache import LocalCache
+
+# -------------------------------------------------------
+# ⚙️ Cache des analyses par (client, exercice)
+# -------------------------------------------------------
+# Invalidé à chaque série enregistrée par ce process ; le TTL borne
+# la fraîcheur quand plusieurs workers tournent en parallèle.
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "4096"))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+
+# Pente "récente" calculée sur les N dernières semaines
+RECENT_TREND_WEEKS = int(os.getenv("RECENT_TREND_WEEKS", "8"))
+
+_cache = LocalCache(ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL)
+
+
+def invalidate(client_id: int, exercise_names):
+    """À appeler après l'écriture de séries."""
+    for name in exercise_names:
+        _cache.invalidate((client_id, name))
+
+
+# =======================================================
+# 🗄️ Une ligne par séance (client, exercice, date) — agrégée en SQL
+# =======================================================
+# 1RM estimé (Epley) : poids × (1 + reps / 30) ; sans reps → poids
+SESSIONS_SQL = text("""
+    SELECT exercise_name,
+           date,
+           COUNT(*)                                             AS sets,
+           MAX(weight)                                          AS top_weight,
+           SUM(weight * COALESCE(reps, 1))                      AS volume,
+           MAX(weight * (1 + COALESCE(reps, 0) / 30.0))         AS e1rm
+    FROM exercise_set_tracking
+    WHERE client_id = :client_id
+      AND weight IS NOT NULL
+      AND (CAST(:exercises AS text[]) IS NULL OR exercise_name = ANY(:exercises))
+    GROUP BY exercise_name, date
+    ORDER BY exercise_name, date
+""")
+
+
+EXERCISE_NAMES_SQL = text("""
+    SELECT DISTINCT exercise_name
+    FROM exercise_set_tracking
+    WHERE client_id = :client_id AND weight IS NOT NULL
+""")
+
+
+def _slope_per_week(days: np.ndarray, values: np.ndarray) -> float:
+    """Pente de la régression linéaire (kg / semaine), 0 si < 2 points."""
+    if len(days) < 2 or np.ptp(days) == 0:
+        return 0.0
+    slope = np.polyfit(days, values, 1)[0]
+    return round(float(slope) * 7, 3)
+
+
+def analyze_sessions(exercise_name: str, sessions: list) -> dict:
+    """
+    Calculs vectorisés sur les séances (triées par date) :
+    séries temporelles, records (1RM estimé > meilleur précédent),
+    volume hebdomadaire (semaine ISO) et pentes de progression.
+    """
+    if not sessions:
+        return {
+            "exercise_name": exercise_name,
+            "sessions": [],
+            "weekly_volume": [],
+            "best_1rm": 0.0,
+            "personal_records": 0,
+            "trend_per_week": 0.0,
+            "recent_trend_per_week": 0.0,
+        }
+
+    dates = [s["date"] for s in sessions]
+    ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+    e1rm = np.array([float(s["e1rm"]) for s in sessions])
+    volume = np.array([float(s["volume"]) for s in sessions])
+    sets = np.array([s["sets"] for s in sessions], dtype=np.int64)
+
+    # Record : strictement au-dessus du meilleur des séances précédentes
+    previous_best = np.concatenate(([-np.inf], np.maximum.accumulate(e1rm)[:-1]))
+    is_pr = e1rm > previous_best
+
+    # Volume par semaine ISO (lundi = ordinal - weekday)
+    weekdays = np.array([d.weekday() for d in dates], dtype=np.int64)
+    week_starts, week_index = np.unique(ordinals - weekdays, return_inverse=True)
+    week_volume = np.bincount(week_index, weights=volume)
+    week_sets = np.bincount(week_index, weights=sets)
+
+    recent = ordinals >= ordinals[-1] - RECENT_TREND_WEEKS * 7
+
+    return {
+        "exercise_name": exercise_name,
+        "sessions": [
+            {
+                "date": d,
+                "sets": int(sets[i]),
+                "top_weight": float(sessions[i]["top_weight"]),
+                "volume": round(float(volume[i]), 2),
+                "estimated_1rm": round(float(e1rm[i]), 2),
+                "is_pr": bool(is_pr[i]),
+            }
+            for i, d in enumerate(dates)
+        ],
+        "weekly_volume": [
+            {
+                "week": "{}-W{:02d}".format(*date.fromordinal(int(w)).isocalendar()[:2]),
+                "week_start": date.fromordinal(int(w)),
+                "sets": int(week_sets[i]),
+                "volume": round(float(week_volume[i]), 2),
+            }
+            for i, w in enumerate(week_starts)
+        ],
+        "best_1rm": round(float(e1rm.max()), 2),
+        "personal_records": int(is_pr.sum()),
+        "trend_per_week": _slope_per_week(ordinals, e1rm),
+        "recent_trend_per_week": _slope_per_week(ordinals[recent], e1rm[recent]),
+    }
+
+
+def exercise_analytics(db: Session, client_id: int, exercise_names: list | None = None) -> dict:
+    """
+    {exercice: analyse} pour les exercices demandés (tous si None : la
+    liste vient d'une requête DISTINCT légère). Les analyses en cache sont
+    réutilisées, les autres sont calculées à partir d'une seule requête SQL.
+    """
+    if exercise_names is None:
+        exercise_names = db.scalars(EXERCISE_NAMES_SQL, {"client_id": client_id}).all()
+
+    found = {}
+    missing = []
+    for name in dict.fromkeys(exercise_names):
+        cached = _cache.get((client_id, name))
+        if cached is None:
+            missing.append(name)
+        else:
+            found[name] = cached
+    if not missing:
+        return found
+
+    rows = db.execute(SESSIONS_SQL, {"client_id": client_id, "exercises": missing}).mappings()
+
+    by_exercise = {name: [] for name in missing}
+    for row in rows:
+        by_exercise.setdefault(row["exercise_name"], []).append(row)
+
+    for name, sessions in by_exercise.items():
+        result = analyze_sessions(name, sessions)
+        _cache.set((client_id, name), result)
+        found[name] = result
+
+    return found
+
+
+def exercise_summary(analysis: dict) -> dict:
+    """Résumé compact d'une analyse (page de progression du coach)."""
+    sessions = analysis["sessions"]
+    return {
+        "exercise_name": analysis["exercise_name"],
+        "sessions": len(sessions),
+        "last_session": sessions[-1]["date"] if sessions else None,
+        "best_1rm": analysis["best_1rm"],
+        "personal_records": analysis["personal_records"],
+        "trend_per_week": analysis["trend_per_week"],
+        "recent_trend_per_week": analysis["recent_trend_per_week"],
+    }
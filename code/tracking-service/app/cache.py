@@ -0,0 +1,67 @@
+# app/cache.py
+import time
+import threading
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Petit cache LRU en mémoire avec TTL, propre à chaque process.
+    Chaque entrée peut être rattachée à des "tags" (ex : ids clients)
+    pour être invalidée dès qu'une écriture les concerne.
+    Les routes sync tournent en parallèle dans le threadpool : chaque
+    méthode prend le verrou.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expire_at, value, tags)
+        self._by_tag = {}               # tag -> {key}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags=()):
+        tags = frozenset(tags)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._by_tag.get(tag, ())):
+                self._drop(key)
+
+    def _drop(self, key):
+        """Appelé verrou pris."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,177 @@
+# app/cohort.py
+import os
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .cache import LocalCache
+
+# -------------------------------------------------------
+# ⚙️ Réglages (surchargeables via .env)
+# -------------------------------------------------------
+COHORT_CACHE_TTL = float(os.getenv("COHORT_CACHE_TTL", "300"))
+COHORT_CACHE_SIZE = int(os.getenv("COHORT_CACHE_SIZE", "512"))
+
+# Client "à risque" : conformité en baisse de plus de X points / semaine
+# ou moyenne récente inférieure de X points à la période précédente
+AT_RISK_SLOPE = float(os.getenv("AT_RISK_SLOPE", "5"))
+AT_RISK_DROP = float(os.getenv("AT_RISK_DROP", "15"))
+VOLUME_LEADERS = int(os.getenv("VOLUME_LEADERS", "5"))
+
+DISTRIBUTION_BINS = [0, 20, 40, 60, 80, 100]
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# Clé (coach, fenêtre, fin) ; tags = ids des clients → invalidé à l'écriture
+_cache = LocalCache(COHORT_CACHE_SIZE, COHORT_CACHE_TTL)
+
+
+def invalidate_client(client_id: int):
+    _cache.invalidate_tag(client_id)
+
+
+CLIENTS_SQL = text("SELECT id, email FROM users WHERE coach_id = :coach_id ORDER BY id")
+
+DAILY_SQL = text("""
+    SELECT t.client_id, t.date, AVG(t.compliance_rate) AS rate
+    FROM daily_tracking t
+    JOIN users u ON u.id = t.client_id
+    WHERE u.coach_id = :coach_id AND t.date > :start AND t.date <= :end
+    GROUP BY t.client_id, t.date
+""")
+
+VOLUME_SQL = text("""
+    SELECT s.client_id,
+           COUNT(*)                                          AS sets,
+           COALESCE(SUM(s.weight * COALESCE(s.reps, 1)), 0)  AS volume
+    FROM exercise_set_tracking s
+    JOIN users u ON u.id = s.client_id
+    WHERE u.coach_id = :coach_id AND s.date > :start AND s.date <= :end
+    GROUP BY s.client_id
+""")
+
+
+def _per_client(index: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(index, weights=values, minlength=size)
+
+
+def _round(value) -> float | None:
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+def compute_cohort(clients: list, daily: list, volumes: list, end: date, days: int) -> dict:
+    """
+    Un seul passage vectorisé : toutes les sommes par client sont faites
+    avec np.bincount, la pente de chaque client par moindres carrés
+    (formule fermée, sans boucle Python sur les lignes).
+    """
+    ids = np.array([c["id"] for c in clients], dtype=np.int64)
+    size = len(ids)
+
+    if daily:
+        idx = np.searchsorted(ids, np.array([r["client_id"] for r in daily], dtype=np.int64))
+        x = np.array([(r["date"] - end).days for r in daily], dtype=np.float64)  # ≤ 0
+        y = np.array([float(r["rate"]) for r in daily])
+    else:
+        idx = np.zeros(0, dtype=np.int64)
+        x = y = np.zeros(0)
+
+    ones = np.ones_like(y)
+    n = _per_client(idx, ones, size)
+    sy = _per_client(idx, y, size)
+    sx = _per_client(idx, x, size)
+    sxx = _per_client(idx, x * x, size)
+    sxy = _per_client(idx, x * y, size)
+
+    recent = x > -(days / 2)
+    n_recent = _per_client(idx[recent], ones[recent], size)
+    sy_recent = _per_client(idx[recent], y[recent], size)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sy / n
+        recent_mean = sy_recent / n_recent
+        previous_mean = (sy - sy_recent) / (n - n_recent)
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx) * 7   # points / semaine
+
+    tracked = n > 0
+    tracked_means = mean[tracked]
+
+    # Clients à risque
+    falling = tracked & (n >= 3) & (slope < -AT_RISK_SLOPE)
+    dropping = tracked & (recent_mean - previous_mean < -AT_RISK_DROP)
+    inactive = n_recent == 0
+
+    at_risk = []
+    for i in np.flatnonzero(falling | dropping | inactive):
+        reasons = [
+            label for label, mask in
+            (("tendance en baisse", falling), ("chute récente", dropping), ("aucun suivi récent", inactive))
+            if mask[i]
+        ]
+        at_risk.append({
+            "client_id": int(ids[i]),
+            "email": clients[i]["email"],
+            "average_compliance": _round(mean[i]),
+            "recent_compliance": _round(recent_mean[i]),
+            "previous_compliance": _round(previous_mean[i]),
+            "trend_per_week": _round(slope[i]) if n[i] >= 2 else None,
+            "reasons": reasons,
+        })
+
+    # Volume d'entraînement
+    sets = np.zeros(size)
+    volume = np.zeros(size)
+    if volumes:
+        vidx = np.searchsorted(ids, np.array([r["client_id"] for r in volumes], dtype=np.int64))
+        sets[vidx] = [r["sets"] for r in volumes]
+        volume[vidx] = [float(r["volume"]) for r in volumes]
+
+    leaders = [i for i in np.argsort(-volume, kind="stable")[:VOLUME_LEADERS] if volume[i] > 0]
+
+    counts, _ = np.histogram(tracked_means, bins=DISTRIBUTION_BINS)
+
+    return {
+        "window_days": days,
+        "end": end,
+        "clients": size,
+        "tracked_clients": int(tracked.sum()),
+        "average_compliance": _round(tracked_means.mean()) if tracked_means.size else 0.0,
+        "distribution": [
+            {"range": f"{lo}-{hi}", "clients": int(c)}
+            for lo, hi, c in zip(DISTRIBUTION_BINS, DISTRIBUTION_BINS[1:], counts)
+        ],
+        "percentiles": {
+            f"p{p}": round(float(v), 2)
+            for p, v in zip(PERCENTILES, np.percentile(tracked_means, PERCENTILES))
+        } if tracked_means.size else {},
+        "at_risk": at_risk,
+        "volume_leaders": [
+            {
+                "client_id": int(ids[i]),
+                "email": clients[i]["email"],
+                "sets": int(sets[i]),
+                "volume": round(float(volume[i]), 2),
+            }
+            for i in leaders
+        ],
+    }
+
+
+def coach_cohort(db: Session, coach_id: int, days: int = 28, end: date | None = None) -> dict:
+    """Analyse de tous les clients d'un coach sur les `days` derniers jours."""
+    end = end or date.today()
+    key = (coach_id, days, end)
+
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    params = {"coach_id": coach_id, "start": end - timedelta(days=days), "end": end}
+    clients = db.execute(CLIENTS_SQL, params).mappings().all()
+    daily = db.execute(DAILY_SQL, params).mappings().all()
+    volumes = db.execute(VOLUME_SQL, params).mappings().all()
+
+    result = {"coach_id": coach_id, **compute_cohort(clients, daily, volumes, end, days)}
+    _cache.set(key, result, tags=[c["id"] for c in clients])
+    return result
@@ -0,0 +1,118 @@
+# app/history.py
+import os
+import json
+import base64
+from datetime import date
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+# -------------------------------------------------------
+# ⚙️ Pagination des historiques (surchargeable via .env)
+# -------------------------------------------------------
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "500"))
+MAX_HISTORY_PAGE_SIZE = int(os.getenv("MAX_HISTORY_PAGE_SIZE", "2000"))
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """Le premier élément est toujours la date de la ligne."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [date.fromisoformat(values[0]), *values[1:]]
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(400, "Curseur invalide")
+
+
+def history_params(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    after: str | None = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    group: str | None = Query(None, pattern="^week$"),
+) -> dict:
+    """Paramètres communs : ?from=&to=&after=&limit=&group=week"""
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "after": after,
+        "limit": limit,
+        "group": group,
+    }
+
+
+def history_page(
+    db: Session,
+    model,
+    client_id: int,
+    order_by: list,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after: str | None = None,
+    limit: int = HISTORY_PAGE_SIZE,
+):
+    """
+    Une page d'historique d'un client, triée par `order_by` (date en tête,
+    id en dernier pour l'unicité). Pagination par curseur : seules les
+    lignes strictement après le curseur sont lues (index client_id, date).
+    Retourne (lignes, curseur suivant | None).
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(400, "'from' doit précéder 'to'")
+
+    query = db.query(model).filter(model.client_id == client_id)
+
+    if date_from:
+        query = query.filter(model.date >= date_from)
+    if date_to:
+        query = query.filter(model.date <= date_to)
+    if after:
+        values = decode_cursor(after)
+        if len(values) != len(order_by):
+            raise HTTPException(400, "Curseur invalide")
+        query = query.filter(tuple_(*order_by) > tuple_(*values))
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, col.key) for col in order_by])
+
+
+def group_by_iso_week(rows: list) -> list:
+    """[{week: "2025-W07", week_start, items}] dans l'ordre des lignes."""
+    weeks = {}
+    for row in rows:
+        year, week, weekday = row.date.isocalendar()
+        key = f"{year}-W{week:02d}"
+        if key not in weeks:
+            weeks[key] = {
+                "week": key,
+                "week_start": date.fromisocalendar(year, week, 1),
+                "items": [],
+            }
+        weeks[key]["items"].append(row)
+    return list(weeks.values())
+
+
+def history_response(
+    db: Session, response: Response, model, client_id: int, order_by: list, params: dict
+) -> list:
+    """Page (ou page groupée par semaine ISO) + en-tête X-Next-Cursor."""
+    rows, next_cursor = history_page(
+        db, model, client_id, order_by,
+        params["date_from"], params["date_to"], params["after"], params["limit"],
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return group_by_iso_week(rows) if params["group"] == "week" else rows
@@ -1,9 +1,9 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import (
-    func,
     Column,
     Integer,
     String,
@@ -11,12 +11,21 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Date,
+    Index,
 )
 from datetime import date
+import os
 
-from .db import Base, engine, get_db
+from .db import Base, engine, get_db, SessionLocal
 from . import models, schemas
 from .security import verify_token
+from .stats import coach_compliance
+from .history import history_params, history_response
+from .migrations import run_migrations
+from .rollups import average_compliance, backfill_if_empty
+from .tracking import upsert_day
+from . import analytics
+from .cohort import coach_cohort, invalidate_client
 
 # =======================================================
 # 🧩 Modèle User minimal pour lire la table du auth-service
@@ -44,6 +53,7 @@ class ExerciseSetTracking(Base):
     exercise_name = Column(String, nullable=False)         # "Développé couché"
     set_index = Column(Integer, nullable=False)            # Série 1,2,3,4...
     weight = Column(Float, nullable=True)                  # poids soulevé
+    reps = Column(Integer, nullable=True)                  # répétitions (1RM estimé)
 
     __table_args__ = (
         UniqueConstraint(
@@ -54,6 +64,7 @@ class ExerciseSetTracking(Base):
             "set_index",
             name="uq_client_day_date_exercise_set",
         ),
+        Index("idx_exercise_client_date", "client_id", "date"),
     )
 
 
@@ -68,25 +79,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 Base.metadata.create_all(bind=engine)
-
-
-# =======================================================
-# 🔧 Calcul du taux de conformité
-# =======================================================
-def calculate_compliance(t: models.DailyTracking):
-    total = 4
-    done = sum(
-        [
-            bool(t.meal_morning_done),
-            bool(t.meal_noon_done),
-            bool(t.meal_evening_done),
-            bool(t.workout_done),
-        ]
-    )
-    t.compliance_rate = round((done / total) * 100, 2)
+# Backfill des agrégats seulement lors de la mise à niveau d'une base existante
+if run_migrations(engine):
+    with SessionLocal() as _db:
+        backfill_if_empty(_db)
 
 
 # =======================================================
@@ -100,17 +100,22 @@ def health():
 # =======================================================
 # 👤 Routes protégées — Tracking repas / entraînement
 # =======================================================
-@app.get("/tracking/me/week", response_model=list[schemas.TrackingOut])
+TrackingHistory = list[schemas.TrackingOut] | list[schemas.TrackingWeek]
+ExerciseHistory = list[schemas.ExerciseSetOut] | list[schemas.ExerciseSetWeek]
+
+TRACKING_ORDER = [models.DailyTracking.date, models.DailyTracking.id]
+
+
+@app.get("/tracking/me/week", response_model=TrackingHistory)
 def get_week_tracking(
+    response: Response,
+    params: dict = Depends(history_params),
     db: Session = Depends(get_db),
     user=Depends(verify_token),
 ):
+    """?from=&to= (dates), ?after=<X-Next-Cursor>&limit=, ?group=week"""
     uid = user["user_id"]
-    return (
-        db.query(models.DailyTracking)
-        .filter(models.DailyTracking.client_id == uid)
-        .all()
-    )
+    return history_response(db, response, models.DailyTracking, uid, TRACKING_ORDER, params)
 
 
 @app.patch("/tracking/me/update", response_model=schemas.TrackingOut)
@@ -125,37 +130,13 @@ def update_day_tracking(
     if not day_name:
         raise HTTPException(400, "Le champ 'day' est requis")
 
-    # Récupération ou création du tracking du jour
-    day = (
-        db.query(models.DailyTracking)
-        .filter(
-            models.DailyTracking.client_id == uid,
-            models.DailyTracking.day == day_name,
-        )
-        .first()
-    )
-
-    if not day:
-        day = models.DailyTracking(client_id=uid, day=day_name)
-        db.add(day)
-
-    # Tolérance pour anciens champs
-    key_map = {
-        "meal_matin_done": "meal_morning_done",
-        "meal_midi_done": "meal_noon_done",
-        "meal_soir_done": "meal_evening_done",
-    }
-
-    for key, value in payload.items():
-        mapped = key_map.get(key, key)
-        if hasattr(day, mapped):
-            setattr(day, mapped, value)
-
-    # recalcul conformité
-    calculate_compliance(day)
+    # Un seul UPSERT atomique (taux calculé en SQL) + agrégats,
+    # dans la même transaction. Seules les cases repas / entraînement
+    # sont modifiables (anciens noms acceptés).
+    day = upsert_day(db, uid, day_name, payload)
 
     db.commit()
-    db.refresh(day)
+    invalidate_client(uid)
     return day
 
 
@@ -165,62 +146,67 @@ def get_stats(
     user=Depends(verify_token),
 ):
     uid = user["user_id"]
-    records = (
-        db.query(models.DailyTracking)
-        .filter(models.DailyTracking.client_id == uid)
-        .all()
-    )
-    if not records:
+    avg = average_compliance(db, uid)
+    if avg is None:
         raise HTTPException(404, "Aucun suivi trouvé")
 
-    avg = sum([r.compliance_rate for r in records]) / len(records)
-    return {"client_id": uid, "average_compliance": round(avg, 2)}
+    return {"client_id": uid, "average_compliance": avg}
 
 
 # =======================================================
 # 🧑‍🏫 Routes coach — consulter le suivi client
 # =======================================================
-@app.get("/tracking/coach/{coach_id}/clients-stats")
+@app.get(
+    "/tracking/coach/{coach_id}/clients-stats",
+    response_model=list[schemas.ClientComplianceStats],
+)
 def get_clients_compliance_for_coach(
     coach_id: int,
+    start: date | None = None,
+    end: date | None = None,
     db: Session = Depends(get_db),
 ):
+    """
+    Une seule requête groupée pour tous les clients du coach :
+    moyenne, moyenne des 7 derniers jours, série en cours, jours suivis.
+    Fenêtre optionnelle ?start=YYYY-MM-DD&end=YYYY-MM-DD.
+    """
+    if start and end and start > end:
+        raise HTTPException(400, "'start' doit précéder 'end'")
 
-    clients = db.query(User).filter(User.coach_id == coach_id).all()
-    results = []
+    return coach_compliance(db, coach_id, start, end)
 
-    for c in clients:
-        avg = (
-            db.query(func.avg(models.DailyTracking.compliance_rate))
-            .filter(models.DailyTracking.client_id == c.id)
-            .scalar()
-            or 0
-        )
-        results.append(
-            {
-                "client_id": c.id,
-                "email": c.email,
-                "average_compliance": round(avg, 2),
-            }
-        )
 
-    return results
+@app.get("/tracking/coach/{coach_id}/cohort", response_model=schemas.CohortAnalytics)
+def get_coach_cohort(
+    coach_id: int,
+    days: int = Query(28, ge=7, le=365),
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Vue d'ensemble des clients du coach sur les `days` derniers jours :
+    distribution et percentiles de conformité, clients à risque
+    (tendance en baisse, chute récente, inactifs), meilleurs volumes.
+    """
+    if user["role"] != "coach" or user["user_id"] != coach_id:
+        raise HTTPException(403, "Accès interdit")
+
+    return coach_cohort(db, coach_id, days)
 
 
 @app.get(
     "/tracking/client/{client_id}/week",
-    response_model=list[schemas.TrackingOut],
+    response_model=TrackingHistory,
 )
 def get_tracking_for_client(
     client_id: int,
+    response: Response,
+    params: dict = Depends(history_params),
     db: Session = Depends(get_db),
     user=Depends(verify_token),
 ):
-    return (
-        db.query(models.DailyTracking)
-        .filter(models.DailyTracking.client_id == client_id)
-        .all()
-    )
+    return history_response(db, response, models.DailyTracking, client_id, TRACKING_ORDER, params)
 
 
 @app.get("/tracking/client/{client_id}/stats")
@@ -229,16 +215,8 @@ def get_stats_for_client(
     db: Session = Depends(get_db),
     user=Depends(verify_token),
 ):
-    records = (
-        db.query(models.DailyTracking)
-        .filter(models.DailyTracking.client_id == client_id)
-        .all()
-    )
-    if not records:
-        return {"client_id": client_id, "average_compliance": 0}
-
-    avg = sum([r.compliance_rate for r in records]) / len(records)
-    return {"client_id": client_id, "average_compliance": round(avg, 2)}
+    avg = average_compliance(db, client_id)
+    return {"client_id": client_id, "average_compliance": avg or 0}
 
 
 # =======================================================
@@ -274,46 +252,152 @@ def upsert_exercise_set(
 
     if row:
         row.weight = data.get("weight")
+        row.reps = data.get("reps")
     else:
         row = ExerciseSetTracking(client_id=uid, **data)
         db.add(row)
 
     db.commit()
     db.refresh(row)
+    analytics.invalidate(uid, [row.exercise_name])
+    invalidate_client(uid)
     return row
 
 
+# ---- 1 bis. Toute une séance en une requête (UPSERT groupé)
+MAX_BATCH_SETS = int(os.getenv("MAX_BATCH_SETS", "200"))
+
+
+@app.post("/tracking/me/exercises/batch", response_model=list[schemas.ExerciseSetOut])
+def upsert_exercise_sets_batch(
+    payload: schemas.ExerciseSetBatch,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    """
+    Enregistre toutes les séries d'une séance avec un seul
+    INSERT ... ON CONFLICT (uq_client_day_date_exercise_set) DO UPDATE.
+    Une même série envoyée deux fois : la dernière valeur l'emporte.
+    """
+    uid = user["user_id"]
+
+    if not payload.sets:
+        raise HTTPException(400, "Aucune série fournie")
+    if len(payload.sets) > MAX_BATCH_SETS:
+        raise HTTPException(413, f"Maximum {MAX_BATCH_SETS} séries par requête")
+
+    today = date.today()
+    rows = {}
+    for item in payload.sets:
+        row = {**item.dict(), "client_id": uid}
+        row["date"] = row["date"] or today
+        key = (row["day"], row["date"], row["exercise_name"], row["set_index"])
+        rows[key] = row  # une ligne ne peut pas être modifiée 2 fois par la même requête
+
+    stmt = insert(ExerciseSetTracking).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_client_day_date_exercise_set",
+        set_={"weight": stmt.excluded.weight, "reps": stmt.excluded.reps},
+    ).returning(*ExerciseSetTracking.__table__.c)
+
+    saved = db.execute(stmt).mappings().all()
+    db.commit()
+    analytics.invalidate(uid, {row["exercise_name"] for row in saved})
+    invalidate_client(uid)
+    return saved
+
+
 # ---- 2. Exos du client connecté
+EXERCISE_ORDER = [
+    ExerciseSetTracking.date,
+    ExerciseSetTracking.exercise_name,
+    ExerciseSetTracking.set_index,
+    ExerciseSetTracking.id,
+]
+
+
 @app.get(
     "/tracking/me/exercises",
-    response_model=list[schemas.ExerciseSetOut],
+    response_model=ExerciseHistory,
 )
 def get_my_exercises(
+    response: Response,
+    params: dict = Depends(history_params),
     db: Session = Depends(get_db),
     user=Depends(verify_token),
 ):
+    """?from=&to= (dates), ?after=<X-Next-Cursor>&limit=, ?group=week"""
     uid = user["user_id"]
-    return (
-        db.query(ExerciseSetTracking)
-        .filter(ExerciseSetTracking.client_id == uid)
-        .order_by(ExerciseSetTracking.date, ExerciseSetTracking.exercise_name, ExerciseSetTracking.set_index)
-        .all()
-    )
+    return history_response(db, response, ExerciseSetTracking, uid, EXERCISE_ORDER, params)
 
 
 # ---- 3. Exos d'un client (coach)
 @app.get(
     "/tracking/client/{client_id}/exercises",
-    response_model=list[schemas.ExerciseSetOut],
+    response_model=ExerciseHistory,
 )
 def get_client_exercises(
     client_id: int,
+    response: Response,
+    params: dict = Depends(history_params),
     db: Session = Depends(get_db),
     user=Depends(verify_token),
 ):
-    return (
-        db.query(ExerciseSetTracking)
-        .filter(ExerciseSetTracking.client_id == client_id)
-        .order_by(ExerciseSetTracking.date, ExerciseSetTracking.exercise_name, ExerciseSetTracking.set_index)
-        .all()
-    )
+    return history_response(db, response, ExerciseSetTracking, client_id, EXERCISE_ORDER, params)
+
+
+# =======================================================
+# 📈 Analyses de progression (1RM estimé, volume, records)
+# =======================================================
+def _exercise_analytics(db: Session, client_id: int, exercise_name: str) -> dict:
+    return analytics.exercise_analytics(db, client_id, [exercise_name])[exercise_name]
+
+
+def _progress_summary(db: Session, client_id: int) -> list:
+    results = analytics.exercise_analytics(db, client_id)
+    return [analytics.exercise_summary(results[name]) for name in sorted(results)]
+
+
+@app.get("/tracking/me/analytics", response_model=list[schemas.ExerciseProgressSummary])
+def get_my_progress(
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    return _progress_summary(db, user["user_id"])
+
+
+@app.get(
+    "/tracking/me/analytics/{exercise_name}",
+    response_model=schemas.ExerciseAnalytics,
+)
+def get_my_exercise_progress(
+    exercise_name: str,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    return _exercise_analytics(db, user["user_id"], exercise_name)
+
+
+@app.get(
+    "/tracking/client/{client_id}/analytics",
+    response_model=list[schemas.ExerciseProgressSummary],
+)
+def get_client_progress(
+    client_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    return _progress_summary(db, client_id)
+
+
+@app.get(
+    "/tracking/client/{client_id}/analytics/{exercise_name}",
+    response_model=schemas.ExerciseAnalytics,
+)
+def get_client_exercise_progress(
+    client_id: int,
+    exercise_name: str,
+    db: Session = Depends(get_db),
+    user=Depends(verify_token),
+):
+    return _exercise_analytics(db, client_id, exercise_name)
@@ -0,0 +1,42 @@
+# app/migrations.py
+from sqlalchemy import text
+
+from .tracking import MERGE_DUPLICATES_SQL
+from .rollups import REBUILD_SQL
+
+# -----------------------------------------------------------
+# 🧱 Évolutions de schéma idempotentes
+# (create_all ne modifie pas les tables déjà existantes)
+# -----------------------------------------------------------
+MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS idx_tracking_client_date ON daily_tracking (client_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_exercise_client_date ON exercise_set_tracking (client_id, date)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_tracking_client_day ON daily_tracking (client_id, day)",
+    "DROP INDEX IF EXISTS idx_tracking_client_day",
+    "ALTER TABLE exercise_set_tracking ADD COLUMN IF NOT EXISTS reps INTEGER",
+]
+
+
+def run_migrations(engine) -> bool:
+    """
+    Retourne True si la mise à niveau unique a tourné (index unique absent :
+    base antérieure) ; ensuite, plus aucun parcours de daily_tracking.
+    """
+    with engine.begin() as conn:
+        upgrading = conn.execute(
+            text("SELECT to_regclass('uq_tracking_client_day') IS NULL")
+        ).scalar()
+
+        if upgrading:
+            # Doublons (client_id, day) fusionnés avant l'index unique ;
+            # les agrégats sont alors reconstruits dans la même transaction
+            merged = conn.execute(MERGE_DUPLICATES_SQL).rowcount
+            if merged:
+                print(f"🧹 {merged} suivi(s) en double fusionné(s)")
+                conn.execute(text("DELETE FROM compliance_rollups"))
+                conn.execute(REBUILD_SQL, {"client_id": None})
+
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
+
+    return upgrading
@@ -23,7 +23,9 @@ class DailyTracking(Base):
 
     # Index pour les requêtes fréquentes
     __table_args__ = (
-        Index("idx_tracking_client_day", "client_id", "day"),
+        # Une seule ligne par client et par jour (cible de l'UPSERT)
+        Index("uq_tracking_client_day", "client_id", "day", unique=True),
+        Index("idx_tracking_client_date", "client_id", "date"),
     )
 
     def calculate_compliance(self):
@@ -39,3 +41,21 @@ class DailyTracking(Base):
         )
         self.compliance_rate = round((done / total) * 100, 2)
         return self.compliance_rate
+
+
+class ComplianceRollup(Base):
+    """
+    Agrégats de conformité par client, tenus à jour à chaque écriture :
+    - granularity "all"   : bucket = 1970-01-01 (tout l'historique)
+    - granularity "week"  : bucket = lundi de la semaine
+    - granularity "month" : bucket = 1er du mois
+    Moyenne = total_rate / entries.
+    """
+    __tablename__ = "compliance_rollups"
+
+    client_id = Column(Integer, primary_key=True)
+    granularity = Column(String(5), primary_key=True)
+    bucket = Column(Date, primary_key=True)
+
+    entries = Column(Integer, nullable=False, default=0)
+    total_rate = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,143 @@
+# app/rollups.py
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+
+# Bucket unique de la granularité "all"
+ALL_BUCKET = date(1970, 1, 1)
+
+
+def buckets_for(day: date) -> dict:
+    """{granularity: début du bucket} contenant `day`."""
+    return {
+        "all": ALL_BUCKET,
+        "week": day - timedelta(days=day.weekday()),
+        "month": day.replace(day=1),
+    }
+
+
+# =======================================================
+# ✍️ Mise à jour incrémentale (même transaction que l'écriture)
+# =======================================================
+def apply_delta(db: Session, client_id: int, day: date, entries: int, rate: float):
+    """
+    Ajoute (entries, rate) aux trois buckets de `day` en une requête.
+    Nouvelle ligne de suivi : (1, taux) ; ligne modifiée : (0, nouveau - ancien).
+    Pas de commit : c'est l'appelant qui valide la transaction.
+    """
+    if not entries and not rate:
+        return
+
+    R = models.ComplianceRollup
+    stmt = insert(R).values([
+        {"client_id": client_id, "granularity": g, "bucket": b,
+         "entries": entries, "total_rate": rate}
+        for g, b in buckets_for(day).items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[R.client_id, R.granularity, R.bucket],
+        set_={
+            "entries": R.entries + stmt.excluded.entries,
+            "total_rate": R.total_rate + stmt.excluded.total_rate,
+        },
+    ))
+
+
+RECOMPUTE_SQL = text("""
+    INSERT INTO compliance_rollups (client_id, granularity, bucket, entries, total_rate)
+    SELECT :client_id, :granularity, :bucket, COUNT(*), COALESCE(SUM(compliance_rate), 0)
+    FROM daily_tracking
+    WHERE client_id = :client_id
+      AND (CAST(:start AS date) IS NULL OR (date >= :start AND date < :end))
+    ON CONFLICT (client_id, granularity, bucket) DO UPDATE
+    SET entries = EXCLUDED.entries, total_rate = EXCLUDED.total_rate
+""")
+
+
+def recompute_buckets(db: Session, client_id: int, day: date):
+    """Recalcule (valeurs absolues) les trois buckets contenant `day`."""
+    buckets = buckets_for(day)
+    next_month = (buckets["month"] + timedelta(days=32)).replace(day=1)
+    ranges = {
+        "all": (None, None),
+        "week": (buckets["week"], buckets["week"] + timedelta(days=7)),
+        "month": (buckets["month"], next_month),
+    }
+    db.execute(RECOMPUTE_SQL, [
+        {"client_id": client_id, "granularity": g, "bucket": buckets[g], "start": start, "end": end}
+        for g, (start, end) in ranges.items()
+    ])
+
+
+# =======================================================
+# 📖 Lectures (clé primaire)
+# =======================================================
+def average_compliance(db: Session, client_id: int) -> float | None:
+    """Moyenne sur tout l'historique, None si aucun suivi."""
+    row = db.get(models.ComplianceRollup, (client_id, "all", ALL_BUCKET))
+    if not row or not row.entries:
+        return None
+    return round(row.total_rate / row.entries, 2)
+
+
+# =======================================================
+# 🔁 Reconstruction complète (backfill / correction)
+# =======================================================
+REBUILD_SQL = text("""
+    INSERT INTO compliance_rollups (client_id, granularity, bucket, entries, total_rate)
+    SELECT client_id, 'all', DATE '1970-01-01', COUNT(*), SUM(compliance_rate)
+    FROM daily_tracking
+    WHERE CAST(:client_id AS integer) IS NULL OR client_id = :client_id
+    GROUP BY client_id
+    UNION ALL
+    SELECT client_id, 'week', CAST(date_trunc('week', date) AS date), COUNT(*), SUM(compliance_rate)
+    FROM daily_tracking
+    WHERE CAST(:client_id AS integer) IS NULL OR client_id = :client_id
+    GROUP BY client_id, date_trunc('week', date)
+    UNION ALL
+    SELECT client_id, 'month', CAST(date_trunc('month', date) AS date), COUNT(*), SUM(compliance_rate)
+    FROM daily_tracking
+    WHERE CAST(:client_id AS integer) IS NULL OR client_id = :client_id
+    GROUP BY client_id, date_trunc('month', date)
+""")
+
+
+def rebuild_rollups(db: Session, client_id: int | None = None) -> int:
+    """Recalcule les agrégats depuis daily_tracking (un client ou tous)."""
+    # Les écritures concurrentes attendent la fin de la reconstruction
+    db.execute(text("LOCK TABLE compliance_rollups IN EXCLUSIVE MODE"))
+
+    R = models.ComplianceRollup
+    delete = db.query(R)
+    if client_id is not None:
+        delete = delete.filter(R.client_id == client_id)
+    delete.delete(synchronize_session=False)
+
+    inserted = db.execute(REBUILD_SQL, {"client_id": client_id}).rowcount
+    db.commit()
+    return inserted
+
+
+def backfill_if_empty(db: Session):
+    """Premier démarrage après ajout de la table : calcul depuis l'historique."""
+    has_rollups = db.query(models.ComplianceRollup.client_id).first()
+    has_tracking = db.query(models.DailyTracking.id).first()
+    if has_tracking and not has_rollups:
+        print("📊 Backfill des agrégats de conformité →", rebuild_rollups(db), "ligne(s)")
+
+
+if __name__ == "__main__":
+    # python -m app.rollups [client_id] → backfill / reconstruction
+    import sys
+    from .db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        target = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        print("📊 Agrégats reconstruits →", rebuild_rollups(db, target), "ligne(s)")
+    finally:
+        db.close()
@@ -1,6 +1,6 @@
 # app/schemas.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 # -------------------------------------------------
@@ -36,6 +36,12 @@ class TrackingOut(TrackingBase):
         from_attributes = True
 
 
+class TrackingWeek(BaseModel):
+    week: str            # "2025-W07"
+    week_start: date     # lundi
+    items: List[TrackingOut]
+
+
 # -------------------------------------------------
 # 🔵 Tracking des exercices (poids par série)
 # -------------------------------------------------
@@ -45,6 +51,7 @@ class ExerciseSetBase(BaseModel):
     exercise_name: str
     set_index: int
     weight: Optional[float] = None
+    reps: Optional[int] = None    # pour le 1RM estimé (facultatif)
 
 
 class ExerciseSetOut(ExerciseSetBase):
@@ -54,3 +61,103 @@ class ExerciseSetOut(ExerciseSetBase):
 
     class Config:
         from_attributes = True
+
+
+class ExerciseSetBatch(BaseModel):
+    sets: List[ExerciseSetBase]
+
+
+class ExerciseSetWeek(BaseModel):
+    week: str
+    week_start: date
+    items: List[ExerciseSetOut]
+
+
+# -------------------------------------------------
+# 🧑‍🏫 Conformité des clients d'un coach
+# -------------------------------------------------
+class ClientComplianceStats(BaseModel):
+    client_id: int
+    email: Optional[str] = None
+    average_compliance: float
+    last_7_days_compliance: float
+    days_tracked: int
+    streak: int
+    last_tracked: Optional[date] = None
+
+
+# -------------------------------------------------
+# 📈 Analyses de progression (surcharge progressive)
+# -------------------------------------------------
+class ExerciseSession(BaseModel):
+    date: date
+    sets: int
+    top_weight: float
+    volume: float
+    estimated_1rm: float
+    is_pr: bool
+
+
+class WeeklyVolume(BaseModel):
+    week: str
+    week_start: date
+    sets: int
+    volume: float
+
+
+class ExerciseAnalytics(BaseModel):
+    exercise_name: str
+    sessions: List[ExerciseSession]
+    weekly_volume: List[WeeklyVolume]
+    best_1rm: float
+    personal_records: int
+    trend_per_week: float          # kg de 1RM estimé gagnés par semaine
+    recent_trend_per_week: float   # idem sur les dernières semaines
+
+
+class ExerciseProgressSummary(BaseModel):
+    exercise_name: str
+    sessions: int
+    last_session: Optional[date] = None
+    best_1rm: float
+    personal_records: int
+    trend_per_week: float
+    recent_trend_per_week: float
+
+
+# -------------------------------------------------
+# 👥 Analyse de cohorte (tous les clients d'un coach)
+# -------------------------------------------------
+class ComplianceBucket(BaseModel):
+    range: str          # "60-80"
+    clients: int
+
+
+class AtRiskClient(BaseModel):
+    client_id: int
+    email: Optional[str] = None
+    average_compliance: Optional[float] = None
+    recent_compliance: Optional[float] = None
+    previous_compliance: Optional[float] = None
+    trend_per_week: Optional[float] = None
+    reasons: List[str]
+
+
+class VolumeLeader(BaseModel):
+    client_id: int
+    email: Optional[str] = None
+    sets: int
+    volume: float
+
+
+class CohortAnalytics(BaseModel):
+    coach_id: int
+    window_days: int
+    end: date
+    clients: int
+    tracked_clients: int
+    average_compliance: float
+    distribution: List[ComplianceBucket]
+    percentiles: Dict[str, float]
+    at_risk: List[AtRiskClient]
+    volume_leaders: List[VolumeLeader]
@@ -0,0 +1,92 @@
+# app/stats.py
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# =======================================================
+# 📊 Conformité de tous les clients d'un coach (1 requête)
+# =======================================================
+# - per_day  : une ligne par client / date (moyenne de la journée)
+# - islands  : dates consécutives actives (taux > 0) → même groupe
+# - streaks  : série la plus récente de chaque client
+# - agg      : moyenne, moyenne 7 jours, jours suivis
+COACH_COMPLIANCE_SQL = text("""
+    WITH clients AS (
+        SELECT id, email FROM users WHERE coach_id = :coach_id
+    ),
+    per_day AS (
+        SELECT t.client_id, t.date,
+               SUM(t.compliance_rate) AS rate_sum,
+               COUNT(*)               AS n,
+               AVG(t.compliance_rate) AS rate
+        FROM daily_tracking t
+        JOIN clients c ON c.id = t.client_id
+        WHERE (CAST(:start AS date) IS NULL OR t.date >= CAST(:start AS date))
+          AND t.date <= CAST(:end AS date)
+        GROUP BY t.client_id, t.date
+    ),
+    islands AS (
+        SELECT client_id, date,
+               date - CAST(ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY date) AS integer) AS grp
+        FROM per_day
+        WHERE rate > 0
+    ),
+    streaks AS (
+        SELECT DISTINCT ON (client_id) client_id, MAX(date) AS last_day, COUNT(*) AS length
+        FROM islands
+        GROUP BY client_id, grp
+        ORDER BY client_id, MAX(date) DESC
+    ),
+    agg AS (
+        SELECT client_id,
+               SUM(rate_sum) / SUM(n) AS mean,
+               SUM(rate_sum) FILTER (WHERE date > CAST(:end AS date) - 7)
+                   / NULLIF(SUM(n) FILTER (WHERE date > CAST(:end AS date) - 7), 0) AS last_7,
+               COUNT(*)  AS days_tracked,
+               MAX(date) AS last_tracked
+        FROM per_day
+        GROUP BY client_id
+    )
+    SELECT c.id AS client_id,
+           c.email,
+           COALESCE(a.mean, 0)         AS mean,
+           COALESCE(a.last_7, 0)       AS last_7,
+           COALESCE(a.days_tracked, 0) AS days_tracked,
+           a.last_tracked,
+           CASE WHEN s.last_day >= CAST(:end AS date) - 1 THEN s.length ELSE 0 END AS streak
+    FROM clients c
+    LEFT JOIN agg a     ON a.client_id = c.id
+    LEFT JOIN streaks s ON s.client_id = c.id
+    ORDER BY c.id
+""")
+
+
+def coach_compliance(
+    db: Session,
+    coach_id: int,
+    start: date | None = None,
+    end: date | None = None,
+) -> list:
+    """
+    Statistiques de conformité de chaque client du coach sur [start, end]
+    (end = aujourd'hui par défaut). La série (streak) compte les jours
+    consécutifs avec un taux > 0 se terminant à `end` ou la veille.
+    """
+    rows = db.execute(
+        COACH_COMPLIANCE_SQL,
+        {"coach_id": coach_id, "start": start, "end": end or date.today()},
+    ).mappings()
+
+    return [
+        {
+            "client_id": r["client_id"],
+            "email": r["email"],
+            "average_compliance": round(float(r["mean"]), 2),
+            "last_7_days_compliance": round(float(r["last_7"]), 2),
+            "days_tracked": r["days_tracked"],
+            "streak": r["streak"],
+            "last_tracked": r["last_tracked"],
+        }
+        for r in rows
+    ]
@@ -0,0 +1,126 @@
+# app/tracking.py
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .rollups import apply_delta, recompute_buckets
+
+# Cases repas / entraînement (chacune compte pour 1/4 du taux)
+TRACKED_FIELDS = ("meal_morning_done", "meal_noon_done", "meal_evening_done", "workout_done")
+
+# Anciens noms encore envoyés par certains clients
+LEGACY_FIELDS = {
+    "meal_matin_done": "meal_morning_done",
+    "meal_midi_done": "meal_noon_done",
+    "meal_soir_done": "meal_evening_done",
+}
+
+
+def compliance_sql(exprs: list) -> str:
+    """Taux (%) calculé en SQL à partir de 4 expressions booléennes."""
+    done = " + ".join(f"CAST(COALESCE({e}, false) AS integer)" for e in exprs)
+    return f"ROUND(({done}) * 100.0 / {len(exprs)}, 2)"
+
+
+def tracked_values(payload: dict) -> dict:
+    """Cases présentes dans le payload (les autres clés sont ignorées)."""
+    values = {}
+    for key, value in payload.items():
+        field = LEGACY_FIELDS.get(key, key)
+        if field in TRACKED_FIELDS:
+            values[field] = bool(value)
+    return values
+
+
+def upsert_sql(fields: list) -> str:
+    """
+    Un seul aller-retour :
+    - `old` verrouille la ligne existante et lit son ancien taux
+      (évalué avant l'INSERT, qui en dépend)
+    - INSERT ... ON CONFLICT (client_id, day) DO UPDATE ne modifie que
+      les cases envoyées et recalcule compliance_rate en SQL
+    """
+    insert_rate = compliance_sql([f":{f}" for f in TRACKED_FIELDS])
+    update_rate = compliance_sql([
+        f"EXCLUDED.{f}" if f in fields else f"t.{f}" for f in TRACKED_FIELDS
+    ])
+    updates = "".join(f"{f} = EXCLUDED.{f}, " for f in fields)
+    columns = ", ".join(TRACKED_FIELDS)
+    params = ", ".join(f":{f}" for f in TRACKED_FIELDS)
+
+    return f"""
+        WITH old AS MATERIALIZED (
+            SELECT compliance_rate FROM daily_tracking
+            WHERE client_id = :client_id AND day = :day
+            FOR UPDATE
+        ),
+        up AS (
+            INSERT INTO daily_tracking AS t (client_id, day, date, {columns}, compliance_rate)
+            SELECT :client_id, :day, :today, {params}, {insert_rate}
+            FROM (SELECT COUNT(*) FROM old) AS locked
+            ON CONFLICT (client_id, day) DO UPDATE
+            SET {updates}compliance_rate = {update_rate}
+            RETURNING t.*, (t.xmax = 0) AS inserted
+        )
+        SELECT up.*, (SELECT compliance_rate FROM old) AS old_rate FROM up
+    """
+
+
+_UPSERTS = {}
+
+
+def upsert_day(db: Session, client_id: int, day_name: str, payload: dict) -> dict:
+    """
+    Crée ou met à jour le suivi (client, jour) et ses agrégats dans la
+    transaction courante (sans commit). Retourne la ligne enregistrée.
+    """
+    values = tracked_values(payload)
+    fields = [f for f in TRACKED_FIELDS if f in values]
+
+    key = tuple(fields)
+    if key not in _UPSERTS:
+        _UPSERTS[key] = text(upsert_sql(fields))
+
+    row = db.execute(_UPSERTS[key], {
+        "client_id": client_id,
+        "day": day_name,
+        "today": date.today(),
+        **{f: values.get(f, False) for f in TRACKED_FIELDS},
+    }).mappings().one()
+
+    if row["inserted"]:
+        apply_delta(db, client_id, row["date"], 1, row["compliance_rate"])
+    elif row["old_rate"] is not None:
+        apply_delta(db, client_id, row["date"], 0, row["compliance_rate"] - row["old_rate"])
+    else:
+        # Ligne créée par une requête concurrente juste avant : ancien taux
+        # inconnu → recalcul des buckets de ce jour depuis daily_tracking
+        recompute_buckets(db, client_id, row["date"])
+
+    return {k: v for k, v in row.items() if k not in ("inserted", "old_rate")}
+
+
+# =======================================================
+# 🧹 Fusion des doublons (client_id, day) avant la contrainte unique
+# =======================================================
+MERGE_DUPLICATES_SQL = text(f"""
+    WITH merged AS (
+        SELECT client_id, day, MIN(id) AS keep_id, MIN(date) AS date,
+               {", ".join(f"bool_or({f}) AS {f}" for f in TRACKED_FIELDS)}
+        FROM daily_tracking
+        GROUP BY client_id, day
+        HAVING COUNT(*) > 1
+    ),
+    kept AS (
+        UPDATE daily_tracking t
+        SET date = m.date,
+            {", ".join(f"{f} = COALESCE(m.{f}, false)" for f in TRACKED_FIELDS)},
+            compliance_rate = {compliance_sql([f"m.{f}" for f in TRACKED_FIELDS])}
+        FROM merged m
+        WHERE t.id = m.keep_id
+    )
+    DELETE FROM daily_tracking t
+    USING merged m
+    WHERE t.client_id = m.client_id AND t.day = m.day AND t.id <> m.keep_id
+""")